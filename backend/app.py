@@ -1,23 +1,63 @@
 
 import json
-from fastapi import FastAPI, HTTPException, status, Depends
+from fastapi import FastAPI, HTTPException, status, Depends, Request, Query, Response, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
 import os
 from dotenv import load_dotenv
 import motor.motor_asyncio
-from passlib.context import CryptContext
-from jose import JWTError, jwt
+from pymongo import ASCENDING, DESCENDING, IndexModel, InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from bson import ObjectId, json_util
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 import datetime
 import asyncio
-import httpx
+import base64
+import csv
+import io
+import hashlib
+import heapq
+import hmac
+import math
+import time
+import urllib.parse
+import functools
+import importlib.util
+import sys
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
+from caching import SingleFlight, TTLCache
+from fast_responses import CompressionMiddleware, FastJSONResponse, dumps as json_dumps
+from itinerary_store import compact_itinerary, expand_itinerary
+from metrics import MetricsMiddleware, MetricsRegistry
 
 load_dotenv()
 
 
+def lazy_import(name: str):
+    """Return module `name` without executing it until an attribute is first used.
+
+    Keeps heavy dependencies that only some requests need off the cold-start path.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+# python-jose pulls in cryptography; only token issue/verify needs it
+jwt = lazy_import("jose.jwt")
+
+
 # --- Payment and AI-related configuration removed for minimal waitlist/survey backend ---
 
 # Keep-alive configuration
@@ -26,9 +66,13 @@ KEEP_ALIVE_INTERVAL = 14 * 60  # 14 minutes
 
 # Global variable to store the keep-alive task
 keep_alive_task = None
+user_cache_watch_task = None
+email_index_task = None
+database_bootstrap_task = None
 
 async def ping_self():
     """Ping the server to keep it awake"""
+    import httpx  # only the keep-alive loop uses it, 14 minutes after startup
     try:
         async with httpx.AsyncClient() as client:
             response = await client.get(f"{RENDER_SERVICE_URL}/api/health", timeout=10)
@@ -51,10 +95,21 @@ async def start_keep_alive_task():
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage the application lifespan"""
-    global keep_alive_task
+    global keep_alive_task, user_cache_watch_task, database_bootstrap_task
     
     # Startup
-    await start_database()
+    if INDEX_SELF_CHECK or WARMUP_BLOCKING:
+        # The self-check must be able to fail the deploy, so it blocks startup
+        await bootstrap_database()
+    else:
+        # Connecting to Mongo, building indexes and warming up can take seconds;
+        # serve /api/health meanwhile and report progress on /api/health/ready
+        database_bootstrap_task = asyncio.create_task(bootstrap_database())
+    if SURVEY_WRITE_BEHIND:
+        survey_writer.start()
+    if USER_CACHE_CHANGE_STREAM:
+        user_cache_watch_task = asyncio.create_task(watch_user_changes())
+        print("User cache change stream listener started")
     if "render" in RENDER_SERVICE_URL.lower() or os.getenv("RENDER") == "true":
         keep_alive_task = asyncio.create_task(start_keep_alive_task())
         print("Keep-alive task started for Render deployment")
@@ -62,7 +117,22 @@ async def lifespan(app: FastAPI):
     yield
     
     # Shutdown
+    if database_bootstrap_task and not database_bootstrap_task.done():
+        database_bootstrap_task.cancel()
+        try:
+            await database_bootstrap_task
+        except asyncio.CancelledError:
+            pass
+    await survey_writer.stop()
     await close_database()
+    password_hasher.shutdown()
+    for task in (user_cache_watch_task, email_index_task):
+        if task:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
     if keep_alive_task:
         keep_alive_task.cancel()
         try:
@@ -71,7 +141,12 @@ async def lifespan(app: FastAPI):
             pass
         print("Keep-alive task stopped")
 
-app = FastAPI(lifespan=lifespan)
+# Responses at least this large are gzip/brotli compressed when the client accepts it
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
+
+app.add_middleware(CompressionMiddleware, minimum_size=COMPRESSION_MIN_SIZE)
 
 app.add_middleware(
     CORSMiddleware,
@@ -81,13 +156,197 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Served at /metrics; added last so it is the outermost middleware and times everything
+metrics = MetricsRegistry()
+app.add_middleware(MetricsMiddleware, registry=metrics)
+
 MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
-client_mongo = motor.motor_asyncio.AsyncIOMotorClient(MONGODB_URI)
+# Connections the driver keeps open; warm-up opens them before the instance reports ready
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 5))
+client_mongo = motor.motor_asyncio.AsyncIOMotorClient(
+    MONGODB_URI, minPoolSize=MONGO_MIN_POOL_SIZE, event_listeners=metrics.mongo_listeners()
+)
 db = client_mongo["user_database"]
 
 users_collection = db["users"]
 # Only survey collection is used for survey responses
 waitlist_collection = db["waitlist_emails"]
+
+# Email membership index configuration
+EMAIL_INDEX_ENABLED = os.getenv("EMAIL_INDEX_ENABLED", "true").lower() == "true"
+EMAIL_INDEX_CAPACITY = int(os.getenv("EMAIL_INDEX_CAPACITY", 1_000_000))
+EMAIL_INDEX_ERROR_RATE = float(os.getenv("EMAIL_INDEX_ERROR_RATE", 0.001))
+EMAIL_INDEX_RESYNC_INTERVAL = int(os.getenv("EMAIL_INDEX_RESYNC_INTERVAL", 60 * 60))  # seconds
+
+def email_fingerprint(email: str) -> tuple:
+    """Two independent 64-bit hashes of an email; the first doubles as its fingerprint"""
+    digest = hashlib.blake2b(email.encode(), digest_size=16).digest()
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, h1: int, h2: int):
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, hashes: tuple):
+        for pos in self._positions(*hashes):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, hashes: tuple) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(*hashes))
+
+class EmailIndex:
+    """Which emails are already on the waitlist or in the survey responses.
+
+    A Bloom filter rejects most unknown emails in a few bit probes. Anything
+    that passes it is confirmed against a sorted array of 64-bit fingerprints
+    (8 bytes per address) plus a small set of recent additions.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.ready = False
+        self.last_synced = None
+        self.negatives = 0
+        self.positives = 0
+        self.fallbacks = 0
+        self.bloom = BloomFilter(capacity, error_rate)
+        self._sorted = array("Q")
+        self._recent = set()
+        self._rebuild_log = None
+
+    def __len__(self):
+        return len(self._sorted) + len(self._recent)
+
+    def _has(self, fingerprint: int) -> bool:
+        if fingerprint in self._recent:
+            return True
+        i = bisect_left(self._sorted, fingerprint)
+        return i < len(self._sorted) and self._sorted[i] == fingerprint
+
+    def _add(self, hashes: tuple):
+        if self._has(hashes[0]):
+            return
+        self.bloom.add(hashes)
+        self._recent.add(hashes[0])
+        # Merge geometrically so streaming millions of addresses stays O(n log n)
+        if len(self._recent) > max(50_000, len(self._sorted) // 4):
+            self._compact()
+
+    def _compact(self):
+        self._sorted = array("Q", heapq.merge(self._sorted, sorted(self._recent)))
+        self._recent = set()
+
+    def add(self, email: str):
+        if self._rebuild_log is not None:
+            self._rebuild_log.append(email)
+        self._add(email_fingerprint(email))
+
+    def contains(self, email: str) -> Optional[bool]:
+        """True/False once the index is warm, None while callers still have to ask Mongo"""
+        if not self.ready:
+            self.fallbacks += 1
+            return None
+        hashes = email_fingerprint(email)
+        if hashes not in self.bloom or not self._has(hashes[0]):
+            self.negatives += 1
+            return False
+        self.positives += 1
+        return True
+
+    async def rebuild(self, sources):
+        """Stream every email from the (collection, field) `sources` into a fresh index and swap it in"""
+        self._rebuild_log = []
+        try:
+            fresh = EmailIndex(max(self.capacity, 2 * len(self)), self.error_rate)
+            for collection, field in sources:
+                cursor = collection.find({field: {"$type": "string"}}, {field: 1}, batch_size=5000)
+                async for doc in cursor:
+                    fresh._add(email_fingerprint(doc[field]))
+            # Emails inserted while we were streaming
+            for email in self._rebuild_log:
+                fresh._add(email_fingerprint(email))
+            fresh._compact()
+        finally:
+            self._rebuild_log = None
+        self.bloom, self._sorted, self._recent = fresh.bloom, fresh._sorted, fresh._recent
+        self.ready = True
+        self.last_synced = datetime.datetime.now(datetime.timezone.utc)
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "size": len(self),
+            "memory_bytes": len(self.bloom.bits) + self._sorted.itemsize * len(self._sorted) + 64 * len(self._recent),
+            "bloom_hashes": self.bloom.hashes,
+            "negatives": self.negatives,
+            "positives": self.positives,
+            "fallbacks": self.fallbacks,
+            "last_synced": self.last_synced.isoformat() if self.last_synced else None,
+        }
+
+email_index = EmailIndex(EMAIL_INDEX_CAPACITY, EMAIL_INDEX_ERROR_RATE)
+
+async def maintain_email_index():
+    """Warm the email index at startup, then resync it periodically"""
+    while True:
+        try:
+            await email_index.rebuild([(email_registry_collection, "_id")])
+            print(f"Email index synced: {len(email_index)} addresses")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Email index sync failed: {e}")
+        await asyncio.sleep(EMAIL_INDEX_RESYNC_INTERVAL)
+
+# Every email seen by the waitlist or the survey, keyed by _id so claims are atomic:
+# {"_id": email, "sources": ["waitlist", "survey"], "first_seen": datetime}
+email_registry_collection = db["email_registry"]
+
+async def claim_email(email: str, source: str) -> bool:
+    """Record `email` in the registry in one round trip; False if it was already there"""
+    try:
+        await email_registry_collection.insert_one({
+            "_id": email,
+            "sources": [source],
+            "first_seen": datetime.datetime.now(datetime.timezone.utc),
+        })
+        return True
+    except DuplicateKeyError:
+        return False
+
+def registry_upsert(email: str, source: str) -> UpdateOne:
+    return UpdateOne(
+        {"_id": email},
+        {"$addToSet": {"sources": source}, "$setOnInsert": {"first_seen": datetime.datetime.now(datetime.timezone.utc)}},
+        upsert=True,
+    )
+
+async def backfill_email_registry():
+    """Seed the registry from existing waitlist and survey data the first time it is used"""
+    if await email_registry_collection.estimated_document_count() > 0:
+        return
+    total = 0
+    for collection, source in ((waitlist_collection, "waitlist"), (survey_collection, "survey")):
+        ops = []
+        async for doc in collection.find({"email": {"$type": "string"}}, {"email": 1, "_id": 0}, batch_size=5000):
+            ops.append(registry_upsert(doc["email"], source))
+            if len(ops) >= 1000:
+                await email_registry_collection.bulk_write(ops, ordered=False)
+                total += len(ops)
+                ops = []
+        if ops:
+            await email_registry_collection.bulk_write(ops, ordered=False)
+            total += len(ops)
+    if total:
+        print(f"Email registry backfilled from {total} waitlist/survey documents")
+
 # Endpoint to check if email exists in waitlist or survey
 from fastapi import Body
 
@@ -96,13 +355,10 @@ async def check_email(payload: dict = Body(...)):
     email = payload.get("email")
     if not email:
         raise HTTPException(status_code=400, detail="Email required")
-    exists = False
-    # Check in waitlist
-    if await waitlist_collection.find_one({"email": email}):
-        exists = True
-    # Check in survey responses
-    elif await survey_collection.find_one({"email": email}):
-        exists = True
+    known = email_index.contains(email)
+    if known is not None:
+        return {"exists": known}
+    exists = await email_registry_collection.find_one({"_id": email}, {"_id": 1}) is not None
     return {"exists": exists}
 
 # Endpoint to add email to waitlist if unique
@@ -115,11 +371,21 @@ async def join_waitlist(payload: WaitlistEmail):
     email = payload.email
     if not email:
         raise HTTPException(status_code=400, detail="Email required")
-    # Check uniqueness
-    if await waitlist_collection.find_one({"email": email}) or await survey_collection.find_one({"email": email}):
+    # The registry claim is the uniqueness check, so concurrent duplicates cannot both get in
+    if email_index.contains(email):
+        return {"exists": True}
+    if not await claim_email(email, "waitlist"):
+        email_index.add(email)
         return {"exists": True}
     doc = {"email": email, "joined_at": datetime.datetime.now(datetime.timezone.utc)}
-    await waitlist_collection.insert_one(doc)
+    try:
+        await waitlist_collection.insert_one(doc)
+    except DuplicateKeyError:
+        pass  # joined before the registry existed
+    except Exception:
+        await email_registry_collection.delete_one({"_id": email, "sources": ["waitlist"]})
+        raise
+    email_index.add(email)
     return {"exists": False, "message": "Email added to waitlist"}
 survey_collection = db["survey_responses"]
 class SurveyResponse(BaseModel):
@@ -131,42 +397,671 @@ class SurveyResponse(BaseModel):
     submitted_at: Optional[datetime.datetime] = None
 
 
+# Survey write-behind configuration (opt-in)
+SURVEY_WRITE_BEHIND = os.getenv("SURVEY_WRITE_BEHIND", "false").lower() == "true"
+SURVEY_BATCH_SIZE = int(os.getenv("SURVEY_BATCH_SIZE", 500))
+SURVEY_BATCH_INTERVAL = float(os.getenv("SURVEY_BATCH_INTERVAL", 0.5))  # seconds
+SURVEY_QUEUE_SIZE = int(os.getenv("SURVEY_QUEUE_SIZE", 10_000))
+SURVEY_ENQUEUE_TIMEOUT = float(os.getenv("SURVEY_ENQUEUE_TIMEOUT", 2))  # seconds
+SURVEY_WRITE_TIMEOUT = float(os.getenv("SURVEY_WRITE_TIMEOUT", 5))  # seconds
+SURVEY_SPILL_PATH = os.getenv("SURVEY_SPILL_PATH", "survey_spill.ndjson")
+
+class WriteBehindBuffer:
+    """Coalesces documents into unordered insert_many batches by size or time.
+
+    A full queue applies backpressure to callers for up to `enqueue_timeout`
+    seconds. Batches Mongo cannot take within `write_timeout` are appended to
+    a local NDJSON spill file, which is replayed the next time the buffer
+    starts or a later batch succeeds.
+    """
+
+    def __init__(self, collection, batch_size: int, interval: float, max_queue: int,
+                 enqueue_timeout: float, write_timeout: float, spill_path: str, after_write=None):
+        self.collection = collection
+        self.after_write = after_write
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_queue = max_queue
+        self.enqueue_timeout = enqueue_timeout
+        self.write_timeout = write_timeout
+        self.spill_path = spill_path
+        self.written = 0
+        self.spilled = 0
+        self.batches = 0
+        self.queue = None
+        self._task = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        self.queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush everything still queued and stop the background writer"""
+        if not self.running:
+            return
+        await self.queue.put(None)
+        await self._task
+        self._task = None
+
+    async def submit(self, doc: dict):
+        try:
+            await asyncio.wait_for(self.queue.put(doc), self.enqueue_timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="We're receiving a lot of responses right now. Please try again shortly.",
+                headers={"Retry-After": "1"},
+            )
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        await self.replay_spill()
+        stopping = False
+        while not stopping:
+            doc = await self.queue.get()
+            if doc is None:
+                break
+            batch = [doc]
+            deadline = loop.time() + self.interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    doc = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if doc is None:
+                    stopping = True
+                    break
+                batch.append(doc)
+            if await self._flush(batch) and os.path.exists(self.spill_path):
+                await self.replay_spill()
+
+    async def _flush(self, batch: list) -> bool:
+        """Write one batch; returns False if any of it had to be spilled"""
+        self.batches += 1
+        try:
+            # insert_many assigns _id in place, so a replay of a half-written batch cannot duplicate it
+            await asyncio.wait_for(self.collection.insert_many(batch, ordered=False), self.write_timeout)
+            self.written += len(batch)
+            stored, failed = batch, []
+        except BulkWriteError as e:
+            self.written += e.details.get("nInserted", 0)
+            # Duplicate keys were stored by an earlier attempt (e.g. one that timed out after landing)
+            failed_at = {err["index"] for err in e.details.get("writeErrors", []) if err.get("code") != 11000}
+            stored = [doc for i, doc in enumerate(batch) if i not in failed_at]
+            failed = [batch[i] for i in sorted(failed_at)]
+        except Exception as e:
+            print(f"Survey batch write failed, spilling {len(batch)} documents: {e!r}")
+            await self._spill(batch)
+            return False
+        if failed:
+            print(f"Survey batch partially failed, spilling {len(failed)} documents")
+            await self._spill(failed)
+        if stored and self.after_write:
+            # after_write must be idempotent: it also runs for documents stored by an earlier attempt
+            try:
+                await self.after_write(stored)
+            except Exception as e:
+                # Stored already, so the replay dedups them and only re-runs after_write
+                print(f"Survey side effects failed, spilling {len(stored)} stored documents for retry: {e!r}")
+                await self._spill(stored)
+                return False
+        return not failed
+
+    def _append_spill(self, docs: list, path: str = None):
+        with open(path or self.spill_path, "a", encoding="utf-8") as f:
+            for doc in docs:
+                f.write(doc if isinstance(doc, str) else json_util.dumps(doc) + "\n")  # str: a raw line
+            # A spilled batch counts as saved, so it has to be on disk before we move on
+            f.flush()
+            os.fsync(f.fileno())
+
+    async def _spill(self, docs: list):
+        try:
+            await asyncio.to_thread(self._append_spill, docs)
+            self.spilled += len(docs)
+        except Exception as e:
+            print(f"Failed to spill {len(docs)} survey documents to {self.spill_path}: {e}")
+
+    async def replay_spill(self):
+        """Re-insert spilled documents; ones that still fail are spilled again"""
+        replay_path = self.spill_path + ".replaying"
+        spilled = os.path.exists(self.spill_path)
+        if os.path.exists(replay_path):
+            # Left over from a crash mid-replay: replay it before the move below overwrites it
+            await self._replay_file(replay_path)
+        if spilled:
+            os.replace(self.spill_path, replay_path)
+            await self._replay_file(replay_path)
+
+    async def _replay_file(self, path: str):
+        docs, corrupt = [], []
+        with open(path, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    docs.append(json_util.loads(line))
+                except Exception:
+                    # e.g. a line torn by a crash mid-append; keep it aside rather than lose the rest
+                    corrupt.append(line if line.endswith("\n") else line + "\n")
+        if corrupt:
+            self._append_spill(corrupt, self.spill_path + ".corrupt")
+            print(f"Moved {len(corrupt)} unreadable spilled survey lines to {self.spill_path}.corrupt")
+        print(f"Replaying {len(docs)} spilled survey documents")
+        for i in range(0, len(docs), self.batch_size):
+            await self._flush(docs[i:i + self.batch_size])
+        os.remove(path)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.running,
+            "queued": self.queue.qsize() if self.queue else 0,
+            "batches": self.batches,
+            "written": self.written,
+            "spilled": self.spilled,
+        }
+
+# Per-day survey counters, maintained with $inc as responses arrive:
+# {"_id": "YYYY-MM-DD", "total": n, "with_email": n, "step_4_answered": n,
+#  "step_1": {answer: n}, "step_2": {"7": n}, "step_3": {answer: n}}
+survey_daily_stats_collection = db["survey_daily_stats"]
+SURVEY_DISTRIBUTION_STEPS = ("step_1", "step_2", "step_3")
+SURVEY_ANSWER_KEY_LENGTH = 200
+
+def survey_answer_key(answer) -> str:
+    """Answers become field names, so '.', '$' (and '%' for reversibility) are escaped"""
+    text = str(answer)[:SURVEY_ANSWER_KEY_LENGTH]
+    return text.replace("%", "%25").replace(".", "%2E").replace("$", "%24") or "%20"
+
+def survey_counter_increments(docs) -> dict:
+    """Sum the counters a batch of survey documents contributes, by day"""
+    increments = defaultdict(lambda: defaultdict(int))
+    for doc in docs:
+        day = increments[doc["submitted_at"].strftime("%Y-%m-%d")]
+        day["total"] += 1
+        for step in SURVEY_DISTRIBUTION_STEPS:
+            if doc.get(step) is not None:
+                day[f"{step}.{survey_answer_key(doc[step])}"] += 1
+        if (doc.get("step_4") or "").strip():
+            day["step_4_answered"] += 1
+        if doc.get("email"):
+            day["with_email"] += 1
+    return increments
+
+def survey_registry_ops(docs: list) -> list:
+    return [registry_upsert(doc["email"], "survey") for doc in docs if doc.get("email")]
+
+def survey_stats_ops(docs: list) -> list:
+    return [
+        UpdateOne({"_id": day}, {"$inc": dict(counters)}, upsert=True)
+        for day, counters in survey_counter_increments(docs).items()
+    ]
+
+async def after_survey_insert(docs: list):
+    """Register survey emails and bump the daily counters for freshly inserted responses, in one round trip"""
+    writes = []
+    registry_ops = survey_registry_ops(docs)
+    if registry_ops:
+        writes.append(email_registry_collection.bulk_write(registry_ops, ordered=False))
+    stats_ops = survey_stats_ops(docs)
+    if stats_ops:
+        writes.append(survey_daily_stats_collection.bulk_write(stats_ops, ordered=False))
+    await asyncio.gather(*writes)
+
+async def after_survey_write(docs: list):
+    """after_survey_insert for the write-behind buffer, where batches can be replayed or retried.
+
+    Safe to repeat for the same documents: the registry upsert is idempotent, and
+    each response is claimed (stats_counted) before its counters are incremented,
+    so it is only counted once.
+    """
+    claim = ObjectId()
+    ids = [doc["_id"] for doc in docs]
+    writes = [survey_collection.update_many(
+        {"_id": {"$in": ids}, "stats_counted": {"$exists": False}}, {"$set": {"stats_counted": claim}},
+    )]
+    registry_ops = survey_registry_ops(docs)
+    if registry_ops:
+        writes.append(email_registry_collection.bulk_write(registry_ops, ordered=False))
+    await asyncio.gather(*writes)
+    cursor = survey_collection.find({"_id": {"$in": ids}, "stats_counted": claim}, {"_id": 1})
+    claimed = {doc["_id"] async for doc in cursor}
+    stats_ops = survey_stats_ops([doc for doc in docs if doc["_id"] in claimed])
+    if not stats_ops:
+        return
+    try:
+        await survey_daily_stats_collection.bulk_write(stats_ops, ordered=False)
+    except Exception:
+        # Release the claim so a retry counts these responses
+        await survey_collection.update_many({"_id": {"$in": list(claimed)}, "stats_counted": claim}, {"$unset": {"stats_counted": ""}})
+        raise
+
+async def rebuild_survey_stats() -> int:
+    """Recompute every daily counter from survey_responses; run with survey traffic paused"""
+    # Everything stored is counted below, so a later replay of these responses must not count them again
+    await survey_collection.update_many({"stats_counted": {"$exists": False}}, {"$set": {"stats_counted": "rebuild"}})
+    counters = defaultdict(lambda: defaultdict(int))
+    projection = {field: 1 for field in ("submitted_at", "email", "step_4", *SURVEY_DISTRIBUTION_STEPS)}
+    scanned = 0
+    async for doc in survey_collection.find({"submitted_at": {"$type": "date"}}, projection, batch_size=5000):
+        for day, increments in survey_counter_increments([doc]).items():
+            for field, value in increments.items():
+                counters[day][field] += value
+        scanned += 1
+    await survey_daily_stats_collection.delete_many({})
+    docs = []
+    for day, flat in counters.items():
+        doc = {"_id": day}
+        for field, value in flat.items():
+            step, _, key = field.partition(".")
+            if key:
+                doc.setdefault(step, {})[key] = value
+            else:
+                doc[field] = value
+        docs.append(doc)
+    if docs:
+        await survey_daily_stats_collection.insert_many(docs, ordered=False)
+    return scanned
+
+survey_writer = WriteBehindBuffer(
+    survey_collection, SURVEY_BATCH_SIZE, SURVEY_BATCH_INTERVAL, SURVEY_QUEUE_SIZE,
+    SURVEY_ENQUEUE_TIMEOUT, SURVEY_WRITE_TIMEOUT, SURVEY_SPILL_PATH,
+    after_write=after_survey_write,
+)
+
+# Admin-only endpoints require X-Admin-Key to match ADMIN_API_KEY; they are disabled when it is unset
+ADMIN_API_KEY = os.getenv("ADMIN_API_KEY")
+
+async def require_admin(x_admin_key: Optional[str] = Header(None)):
+    if not ADMIN_API_KEY or not x_admin_key or not hmac.compare_digest(x_admin_key, ADMIN_API_KEY):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+
 # Endpoint to receive and store survey responses
 @app.post("/api/survey")
 async def submit_survey(response: SurveyResponse):
     try:
         doc = response.dict()
         doc["submitted_at"] = datetime.datetime.now(datetime.timezone.utc)
-        await survey_collection.insert_one(doc)
+        if survey_writer.running:
+            await survey_writer.submit(doc)
+        else:
+            await survey_collection.insert_one(doc)
+            try:
+                # A fresh insert is neither a replay nor a retry, so it needs no stats_counted claim
+                await after_survey_insert([doc])
+            except Exception as e:
+                # The response is stored; failing now would make the client retry and store it twice.
+                # backfill_survey_stats.py recomputes the counters from survey_responses.
+                print(f"Survey side effects failed for a stored response: {e!r}")
+        if doc.get("email"):
+            email_index.add(doc["email"])
         return {"message": "Survey response recorded"}
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Survey submission error: {e}")
         raise HTTPException(status_code=500, detail="Failed to record survey response")
 
-async def start_database():
-    """Connect to MongoDB"""
+def parse_day(value: Optional[str], name: str) -> Optional[str]:
+    if value is None:
+        return None
     try:
-        await client_mongo.admin.command('ismaster')
+        return datetime.date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be a YYYY-MM-DD date")
+
+# Survey answer distributions and daily counts from the pre-aggregated counters (admin)
+@app.get("/api/survey/analytics", dependencies=[Depends(require_admin)])
+async def survey_analytics(since: Optional[str] = None, until: Optional[str] = None):
+    query = {}
+    since, until = parse_day(since, "since"), parse_day(until, "until")
+    if since:
+        query.setdefault("_id", {})["$gte"] = since
+    if until:
+        query.setdefault("_id", {})["$lte"] = until
+    daily = []
+    totals = defaultdict(int)
+    distributions = {step: defaultdict(int) for step in SURVEY_DISTRIBUTION_STEPS}
+    async for day in survey_daily_stats_collection.find(query).sort("_id", ASCENDING):
+        daily.append({"date": day["_id"], "count": day.get("total", 0)})
+        for field in ("total", "with_email", "step_4_answered"):
+            totals[field] += day.get(field, 0)
+        for step in SURVEY_DISTRIBUTION_STEPS:
+            for key, count in day.get(step, {}).items():
+                distributions[step][urllib.parse.unquote(key)] += count
+    return {
+        "total": totals["total"],
+        "with_email": totals["with_email"],
+        "step_4_answered": totals["step_4_answered"],
+        "daily": daily,
+        "distributions": distributions,
+    }
+
+# Bulk export configuration: dataset -> collection, watermark field and exported fields
+EXPORT_DATASETS = {
+    "waitlist": {"collection": "waitlist_emails", "watermark": "joined_at", "fields": ["email", "joined_at"]},
+    "survey": {
+        "collection": "survey_responses",
+        "watermark": "submitted_at",
+        "fields": ["email", "step_1", "step_2", "step_3", "step_4", "submitted_at"],
+    },
+}
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 2000))
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+def parse_watermark(value: Optional[str]) -> Optional[datetime.datetime]:
+    if value is None:
+        return None
+    try:
+        watermark = datetime.datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="since must be an ISO 8601 timestamp")
+    return watermark if watermark.tzinfo else watermark.replace(tzinfo=datetime.timezone.utc)
+
+async def export_chunks(dataset: str, fmt: str, since: Optional[datetime.datetime], until: datetime.datetime):
+    """Stream a dataset as NDJSON or CSV byte chunks, ordered by its watermark, in constant memory"""
+    spec = EXPORT_DATASETS[dataset]
+    watermark, fields = spec["watermark"], spec["fields"]
+    query = {watermark: {"$lt": until}}
+    if since:
+        query[watermark]["$gte"] = since
+    cursor = db[spec["collection"]].find(
+        query,
+        {"_id": 0, **{field: 1 for field in fields}},
+        batch_size=EXPORT_BATCH_SIZE,
+    ).sort([(watermark, ASCENDING), ("_id", ASCENDING)])
+
+    buffer = io.StringIO() if fmt == "csv" else bytearray()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore") if fmt == "csv" else None
+    if writer:
+        writer.writeheader()
+    async for doc in cursor:
+        if writer:
+            writer.writerow({
+                field: value.isoformat() if isinstance(value, datetime.datetime) else value
+                for field, value in doc.items()
+            })
+            if buffer.tell() >= EXPORT_CHUNK_BYTES:
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+        else:
+            buffer += json_dumps(doc) + b"\n"
+            if len(buffer) >= EXPORT_CHUNK_BYTES:
+                yield bytes(buffer)
+                buffer.clear()
+    remaining = buffer.getvalue().encode() if writer else bytes(buffer)
+    if remaining:
+        yield remaining
+
+# Stream a full or incremental export (admin). Pass X-Export-Until back as `since` next time.
+@app.get("/api/admin/export/{dataset}", dependencies=[Depends(require_admin)])
+async def export_dataset(dataset: str, format: str = Query("ndjson", pattern="^(ndjson|csv)$"), since: Optional[str] = None):
+    if dataset not in EXPORT_DATASETS:
+        raise HTTPException(status_code=404, detail="Unknown dataset")
+    until = datetime.datetime.now(datetime.timezone.utc)
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        export_chunks(dataset, format, parse_watermark(since), until),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{dataset}.{format}"',
+            "X-Export-Until": until.isoformat(),
+        },
+    )
+
+# Indexes every route handler relies on, by collection name
+REQUIRED_INDEXES = {
+    "users": [IndexModel([("email", ASCENDING)], name="email_unique", unique=True)],
+    "waitlist_emails": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel([("joined_at", ASCENDING), ("_id", ASCENDING)], name="joined_at"),
+    ],
+    "survey_responses": [
+        IndexModel([("email", ASCENDING)], name="email"),
+        IndexModel([("submitted_at", ASCENDING), ("_id", ASCENDING)], name="submitted_at"),
+    ],
+    "itineraries": [
+        # Covers the /api/my-itineraries listing: keyset order plus every projected summary field.
+        # itinerary_data.personalized_title is the title of documents migrate_itineraries.py
+        # has not converted yet; it is null (and tiny) in the index for compact ones.
+        IndexModel([
+            ("user_email", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING),
+            ("destination", ASCENDING), ("dates", ASCENDING), ("travelers", ASCENDING),
+            ("title", ASCENDING), ("itinerary_data.personalized_title", ASCENDING),
+            ("hero", ASCENDING), ("itinerary_data.hero_image_url", ASCENDING),
+        ], name="user_email_created_at_summary_v3"),
+    ],
+}
+
+# Indexes superseded by REQUIRED_INDEXES, dropped if still present
+OBSOLETE_INDEXES = {
+    "itineraries": ["user_email", "user_email_created_at_summary", "user_email_created_at_summary_v2"],
+}
+
+# Set INDEX_SELF_CHECK=true to explain() the hot queries at startup and refuse to start on a collection scan
+INDEX_SELF_CHECK = os.getenv("INDEX_SELF_CHECK", "false").lower() == "true"
+
+def hot_queries():
+    """(collection, filter) pairs matching the lookups the route handlers issue"""
+    probe_email = "index-self-check@example.com"
+    return [
+        ("users", {"email": probe_email}),
+        ("email_registry", {"_id": probe_email}),
+        ("itineraries", {"_id": ObjectId(), "user_email": probe_email}),
+        ("itineraries", {"user_email": probe_email}),
+    ]
+
+# True once the unique index on users.email is confirmed; until then signup also checks for the email first
+users_email_unique = False
+
+async def ensure_indexes():
+    """Build the required indexes; create_indexes is a no-op for ones that already exist"""
+    global users_email_unique
+    for collection_name, indexes in REQUIRED_INDEXES.items():
+        try:
+            names = await db[collection_name].create_indexes(indexes)
+            print(f"Indexes ready on {collection_name}: {', '.join(names)}")
+        except Exception as e:
+            # e.g. duplicate emails already stored under a unique index
+            print(f"Failed to build indexes on {collection_name}: {e}")
+    email_index_spec = (await users_collection.index_information()).get("email_unique", {})
+    users_email_unique = bool(email_index_spec.get("unique"))
+    if not users_email_unique:
+        print("Unique index on users.email is missing; signup falls back to checking for the email first")
+    for collection_name, names in OBSOLETE_INDEXES.items():
+        existing = await db[collection_name].index_information()
+        for name in names:
+            if name in existing:
+                await db[collection_name].drop_index(name)
+                print(f"Dropped obsolete index {name} on {collection_name}")
+
+def find_plan_stages(plan) -> set:
+    """Collect every stage name in an explain() plan tree"""
+    stages = set()
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.add(plan["stage"])
+        for value in plan.values():
+            stages |= find_plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            stages |= find_plan_stages(item)
+    return stages
+
+async def verify_query_plans():
+    """Explain each hot query and raise if any of them would scan a whole collection"""
+    scans = []
+    for collection_name, query in hot_queries():
+        explain = await db[collection_name].find(query).limit(1).explain()
+        stages = find_plan_stages(explain.get("queryPlanner", {}).get("winningPlan", {}))
+        print(f"Query plan for {collection_name} {list(query)}: {', '.join(sorted(stages))}")
+        if "COLLSCAN" in stages:
+            scans.append(f"{collection_name} {list(query)}")
+    if scans:
+        raise RuntimeError(f"Index self-check failed, collection scans for: {'; '.join(scans)}")
+
+async def start_database() -> bool:
+    """Connect to MongoDB and build indexes; False if the server could not be reached"""
+    try:
+        await probe_mongo()
         print("Connected to MongoDB")
     except Exception as e:
         print(f"Failed to connect to MongoDB: {e}")
+        return False
+    try:
+        await ensure_indexes()
+        await backfill_email_registry()
+    except Exception as e:
+        if INDEX_SELF_CHECK:
+            raise
+        # Runs as a background task otherwise, so nothing else would report it
+        print(f"Database bootstrap failed: {e}")
+        return True
+    if INDEX_SELF_CHECK:
+        await verify_query_plans()
+    return True
 
 async def close_database():
     """Close MongoDB connection"""
     client_mongo.close()
     print("MongoDB connection closed")
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+@functools.lru_cache(maxsize=None)
+def get_pwd_context():
+    """passlib/bcrypt are imported on the first hash or verify, not at startup"""
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "supersecret")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
+
+# Password hashing executor configuration
+# bcrypt costs ~100-300 ms of CPU per call, so it never runs on the event loop.
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "process")  # process, thread
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 1))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", PASSWORD_HASH_WORKERS * 8))
+
+# Auth admission control (token buckets): capacity is the burst, rate is tokens per second
+AUTH_IP_BURST = int(os.getenv("AUTH_IP_BURST", 20))
+AUTH_IP_RATE = float(os.getenv("AUTH_IP_RATE", 20 / 60))
+AUTH_EMAIL_BURST = int(os.getenv("AUTH_EMAIL_BURST", 5))
+AUTH_EMAIL_RATE = float(os.getenv("AUTH_EMAIL_RATE", 5 / 60))
+AUTH_RATE_LIMIT_MAX_KEYS = int(os.getenv("AUTH_RATE_LIMIT_MAX_KEYS", 100_000))
+
+class PasswordHasher:
+    """Runs bcrypt hash/verify on a worker pool with a bounded queue.
+
+    When more than `max_pending` calls are queued or running, new calls are
+    rejected immediately with a 503 instead of piling up behind the pool.
+    """
+
+    def __init__(self, workers: int, max_pending: int, kind: str = "process"):
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self.kind = kind
+        self.pending = 0
+        self.rejected = 0
+        self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            if self.kind == "process":
+                from concurrent.futures import ProcessPoolExecutor  # loads multiprocessing
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._pool
+
+    def _release(self, _future):
+        self.pending -= 1
+
+    async def run(self, fn, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many sign-in requests right now. Please try again shortly.",
+                headers={"Retry-After": "1"},
+            )
+        loop = asyncio.get_running_loop()
+        future = self._get_pool().submit(fn, *args)
+        self.pending += 1
+        # The slot is released when the worker finishes, not when the caller
+        # goes away, so cancelled requests still count against the queue.
+        future.add_done_callback(lambda f: loop.call_soon_threadsafe(self._release, f))
+        return await asyncio.wrap_future(future)
+
+    async def hash(self, password: str) -> str:
+        return await self.run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self.run(verify_password, plain_password, hashed_password)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING, PASSWORD_HASH_EXECUTOR)
+
+class TokenBucketLimiter:
+    """Per-key token buckets kept in a bounded LRU."""
+
+    def __init__(self, capacity: int, rate: float, max_keys: int = AUTH_RATE_LIMIT_MAX_KEYS):
+        self.capacity = capacity
+        self.rate = rate
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+
+    def allow(self, key: str) -> bool:
+        now = time.monotonic()
+        tokens, last = self._buckets.pop(key, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - last) * self.rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return allowed
+
+    def retry_after(self) -> int:
+        return max(1, int(1 / self.rate)) if self.rate > 0 else 60
+
+auth_ip_limiter = TokenBucketLimiter(AUTH_IP_BURST, AUTH_IP_RATE)
+auth_email_limiter = TokenBucketLimiter(AUTH_EMAIL_BURST, AUTH_EMAIL_RATE)
+
+def get_client_ip(request: Request) -> str:
+    # Render terminates TLS in front of us and appends the peer address last
+    forwarded = request.headers.get("x-forwarded-for")
+    if forwarded:
+        return forwarded.split(",")[-1].strip()
+    return request.client.host if request.client else "unknown"
+
+def check_auth_rate_limit(request: Request, email: str):
+    """Reject with 429 before any bcrypt work if the IP or email is over budget"""
+    for limiter, key in ((auth_ip_limiter, get_client_ip(request)), (auth_email_limiter, (email or "").lower())):
+        if not limiter.allow(key):
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many attempts. Please wait a moment and try again.",
+                headers={"Retry-After": str(limiter.retry_after())},
+            )
 
 def create_access_token(data: dict, expires_delta: datetime.timedelta = None):
     to_encode = data.copy()
@@ -200,10 +1095,71 @@ class StripePaymentVerification(BaseModel):
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/signin")
 
-async def get_user(email: str):
+# Authenticated-user cache configuration
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 10_000))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", 60))  # seconds
+USER_CACHE_CHANGE_STREAM = os.getenv("USER_CACHE_CHANGE_STREAM", "false").lower() == "true"
+
+# Cached user documents keyed by email. Handlers must treat them as read-only.
+user_cache = TTLCache(USER_CACHE_SIZE, USER_CACHE_TTL)
+
+# Coalesce concurrent identical reads (several tabs, parallel /api/me + itinerary fetches)
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+
+user_lookups = SingleFlight(SINGLE_FLIGHT_ENABLED)
+itinerary_lookups = SingleFlight(SINGLE_FLIGHT_ENABLED)
+
+def invalidate_user(email: str):
+    """Drop the cached user and detach any lookup already in flight for it"""
+    user_cache.invalidate(email)
+    user_lookups.forget(email)
+
+# Verified JWT claims keyed by token digest, so a repeat token skips signature checks
+JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", 10_000))
+JWT_CACHE_TTL = float(os.getenv("JWT_CACHE_TTL", 15 * 60))  # seconds, capped by the token's exp
+jwt_claims_cache = TTLCache(JWT_CACHE_SIZE, JWT_CACHE_TTL)
+
+def decode_access_token(token: str) -> dict:
+    """Verify and decode a JWT, reusing claims from earlier verifications of the same token"""
+    digest = hashlib.sha256(token.encode()).digest()
+    payload = jwt_claims_cache.get(digest)
+    if payload is None:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        exp = payload.get("exp")
+        ttl = JWT_CACHE_TTL if exp is None else min(JWT_CACHE_TTL, exp - time.time())
+        if ttl > 0:
+            jwt_claims_cache.set(digest, payload, ttl)
+    return payload
+
+async def watch_user_changes():
+    """Invalidate cached users when any worker writes to the users collection (needs a replica set)"""
     try:
-        user = await users_collection.find_one({"email": email})
+        async with users_collection.watch(full_document="updateLookup") as stream:
+            async for change in stream:
+                email = (change.get("fullDocument") or {}).get("email")
+                if email:
+                    invalidate_user(email)
+                else:
+                    # Deletes only carry the _id, so drop everything
+                    user_cache.clear()
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        print(f"User cache change stream stopped: {e}")
+
+async def load_user(email: str):
+    user = await users_collection.find_one({"email": email})
+    # Skip caching if a write invalidated the user while this read was in flight
+    if user is not None and (user_lookups.is_current(email) or not user_lookups.enabled):
+        user_cache.set(email, user)
+    return user
+
+async def get_user(email: str):
+    user = user_cache.get(email)
+    if user is not None:
         return user
+    try:
+        return await user_lookups.do(email, load_user, email)
     except asyncio.CancelledError:
         print("Get user operation cancelled")
         raise
@@ -211,7 +1167,7 @@ async def get_user(email: str):
 async def authenticate_user(email: str, password: str):
     try:
         user = await get_user(email)
-        if not user or not verify_password(password, user["hashed_password"]):
+        if not user or not await password_hasher.verify(password, user["hashed_password"]):
             return False
         return user
     except asyncio.CancelledError:
@@ -227,7 +1183,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_access_token(token)
         email: str = payload.get("sub")
         if email is None:
             logger.warning("JWT missing subject (sub) claim.")
@@ -278,25 +1234,34 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
 
 
 @app.post("/api/signup", response_model=Token)
-async def signup(user: UserIn):
+async def signup(user: UserIn, request: Request):
     import logging
     logger = logging.getLogger("auth")
     try:
-        if await users_collection.find_one({"email": user.email}):
+        check_auth_rate_limit(request, user.email)
+        # Until the unique index is confirmed (still building, or failed on existing duplicates)
+        # the insert alone would not stop a duplicate account
+        if not users_email_unique and await users_collection.find_one({"email": user.email}, {"_id": 1}):
+            logger.warning(f"Signup failed: Email already registered: {user.email}")
+            raise HTTPException(status_code=400, detail="Email already registered")
+        hashed_password = await password_hasher.hash(user.password)
+        invalidate_user(user.email)
+        # Once the unique index on users.email is in place this is the race-free duplicate check
+        try:
+            await users_collection.insert_one({
+                "name": user.name,
+                "email": user.email,
+                "hashed_password": hashed_password,
+                "subscription_status": "free",  # free, premium
+                "has_premium_subscription": False,  # Boolean for premium subscription access
+                "itineraries_created": 0,
+                "free_itinerary_used": False,
+                "chat_messages_used": 0,  # Track chat usage for free users
+                "created_at": datetime.datetime.now(datetime.timezone.utc)
+            })
+        except DuplicateKeyError:
             logger.warning(f"Signup failed: Email already registered: {user.email}")
             raise HTTPException(status_code=400, detail="Email already registered")
-        hashed_password = get_password_hash(user.password)
-        await users_collection.insert_one({
-            "name": user.name,
-            "email": user.email,
-            "hashed_password": hashed_password,
-            "subscription_status": "free",  # free, premium
-            "has_premium_subscription": False,  # Boolean for premium subscription access
-            "itineraries_created": 0,
-            "free_itinerary_used": False,
-            "chat_messages_used": 0,  # Track chat usage for free users
-            "created_at": datetime.datetime.now(datetime.timezone.utc)
-        })
         # Create access token for the new user
         access_token = create_access_token(data={"sub": user.email})
         return {"access_token": access_token, "token_type": "bearer"}
@@ -316,10 +1281,11 @@ async def signup(user: UserIn):
         )
 
 @app.post("/api/signin", response_model=Token)
-async def signin(form_data: OAuth2PasswordRequestForm = Depends()):
+async def signin(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
     import logging
     logger = logging.getLogger("auth")
     try:
+        check_auth_rate_limit(request, form_data.username)
         user = await authenticate_user(form_data.username, form_data.password)
         if not user:
             logger.warning(f"Signin failed: Incorrect email or password for {form_data.username}")
@@ -341,12 +1307,30 @@ async def signin(form_data: OAuth2PasswordRequestForm = Depends()):
             detail="Failed to sign in. Please try again."
         )
 
+# Conditional GET helpers: clients revalidate with If-None-Match and get a 304 when nothing changed
+CONDITIONAL_CACHE_CONTROL = "private, no-cache"
+
+def make_etag(*parts) -> str:
+    """Strong ETag over the given version fields"""
+    digest = hashlib.sha256("|".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in candidates or etag in candidates
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": CONDITIONAL_CACHE_CONTROL})
+
 @app.get("/api/me")
-async def get_me(current_user: dict = Depends(get_current_user)):
+async def get_me(request: Request, response: Response, current_user: dict = Depends(get_current_user)):
         import logging
         logger = logging.getLogger("auth")
         try:
-            return {
+            profile = {
                 "name": current_user.get("name", ""),
                 "email": current_user.get("email", ""),
                 "subscription_status": current_user.get("subscription_status", "free"),
@@ -355,6 +1339,13 @@ async def get_me(current_user: dict = Depends(get_current_user)):
                 "free_itinerary_used": current_user.get("free_itinerary_used", False),
                 "chat_messages_used": current_user.get("chat_messages_used", 0)
             }
+            # User documents carry no version field, so the profile itself is the version
+            etag = make_etag(*profile.values())
+            if etag_matches(request, etag):
+                return not_modified(etag)
+            response.headers["ETag"] = etag
+            response.headers["Cache-Control"] = CONDITIONAL_CACHE_CONTROL
+            return profile
         except Exception as e:
             logger.error(f"Error in /api/me endpoint: {str(e)}")
             raise HTTPException(
@@ -399,12 +1390,6 @@ async def get_me(current_user: dict = Depends(get_current_user)):
 #     ...existing code...
 
 
-# --- COMMENTED OUT: My itineraries endpoint (not in use for waitlist/survey) ---
-# @app.get("/api/my-itineraries")
-# async def get_my_itineraries(...):
-#     ...existing code...
-
-
 # --- COMMENTED OUT: Itinerary details endpoint (not in use for waitlist/survey) ---
 # @app.get("/api/itinerary/{itinerary_id}")
 # async def get_itinerary_details(...):
@@ -417,6 +1402,100 @@ async def get_me(current_user: dict = Depends(get_current_user)):
 #     ...existing code...
 
 # Health check endpoint for keep-alive
+# Warm-up configuration
+# After a deploy or wake-up the first requests would otherwise pay for Mongo
+# connections and TLS handshakes, spawning the bcrypt pool and loading the
+# passlib/jose backends. Warm-up pays those costs up front; load balancers should
+# route on /api/health/ready, while /api/health stays a cheap liveness check.
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+WARMUP_BLOCKING = os.getenv("WARMUP_BLOCKING", "false").lower() == "true"  # hold startup until warm
+WARMUP_STAGE_TIMEOUT = float(os.getenv("WARMUP_STAGE_TIMEOUT", 30))  # seconds per stage
+WARMUP_USER_CACHE_PRIME = int(os.getenv("WARMUP_USER_CACHE_PRIME", 200))  # most recent users to cache
+DATABASE_RETRY_INTERVAL = float(os.getenv("DATABASE_RETRY_INTERVAL", 5))  # seconds
+READINESS_PING_TIMEOUT = float(os.getenv("READINESS_PING_TIMEOUT", 2))  # seconds
+
+readiness = {"ready": False, "warm_up_seconds": None, "stages": {}}
+
+async def warm_mongo_pool():
+    # Concurrent commands each check out a connection, so the pool opens that many
+    connections = max(1, MONGO_MIN_POOL_SIZE)
+    await asyncio.gather(*(client_mongo.admin.command("ping") for _ in range(connections)))
+    return {"connections": connections}
+
+async def warm_password_hashing():
+    hashed = await password_hasher.hash("warm-up")
+    if not await password_hasher.verify("warm-up", hashed):
+        raise RuntimeError("bcrypt round trip did not verify")
+
+async def warm_jwt():
+    token = create_access_token({"sub": "warm-up"})
+    jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
+async def prime_user_cache():
+    # Newest accounts (by _id) are the likeliest to sign in right after a wake-up
+    limit = min(WARMUP_USER_CACHE_PRIME, USER_CACHE_SIZE)
+    primed = 0
+    if limit > 0:
+        async for user in users_collection.find().sort("_id", DESCENDING).limit(limit):
+            user_cache.set(user["email"], user)
+            primed += 1
+    return {"users": primed}
+
+async def wait_for_email_index():
+    # maintain_email_index() does the loading; just wait for its first sync
+    if not EMAIL_INDEX_ENABLED:
+        return None
+    while not email_index.ready:
+        await asyncio.sleep(0.05)
+    return {"addresses": len(email_index)}
+
+WARMUP_STAGES = (
+    ("mongo_pool", warm_mongo_pool),
+    ("password_hashing", warm_password_hashing),
+    ("jwt", warm_jwt),
+    ("user_cache", prime_user_cache),
+    ("email_index", wait_for_email_index),
+)
+
+async def warm_up():
+    """Run every warm-up stage, then mark the instance ready.
+
+    A failed or timed-out stage is recorded but does not keep the instance out
+    of rotation: serving a partly cold instance beats serving none.
+    """
+    start = time.perf_counter()
+    for name, stage in WARMUP_STAGES:
+        stage_start = time.perf_counter()
+        try:
+            detail = await asyncio.wait_for(stage(), WARMUP_STAGE_TIMEOUT)
+            result = {"ok": True}
+            if detail:
+                result.update(detail)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Warm-up stage {name} failed: {e!r}")
+            result = {"ok": False, "error": repr(e)}
+        result["seconds"] = round(time.perf_counter() - stage_start, 3)
+        readiness["stages"][name] = result
+    readiness["warm_up_seconds"] = round(time.perf_counter() - start, 3)
+    readiness["ready"] = True
+    print(f"Warm-up finished in {readiness['warm_up_seconds']}s")
+
+async def bootstrap_database():
+    """start_database(), retried until MongoDB answers, followed by warm-up"""
+    global email_index_task
+    while not await start_database():
+        await asyncio.sleep(DATABASE_RETRY_INTERVAL)
+    if EMAIL_INDEX_ENABLED:
+        # Only now: syncing before the registry backfill would load a partial index and
+        # answer "unknown" for existing emails until the next resync
+        email_index_task = asyncio.create_task(maintain_email_index())
+    if WARMUP_ENABLED:
+        await warm_up()
+    else:
+        readiness["ready"] = True
+
 @app.get("/api/health")
 async def health_check():
     """Health check endpoint to keep the server awake"""
@@ -426,6 +1505,55 @@ async def health_check():
         "message": "Server is running"
     }
 
+@app.get("/api/health/ready")
+async def readiness_check():
+    """Deep health check: 200 once warm-up has finished and MongoDB answers a ping"""
+    mongo_ok = False
+    if readiness["ready"]:
+        try:
+            await asyncio.wait_for(client_mongo.admin.command("ping"), READINESS_PING_TIMEOUT)
+            mongo_ok = True
+        except Exception:
+            pass
+    ready = readiness["ready"] and mongo_ok
+    return FastJSONResponse(
+        {
+            "status": "ready" if ready else ("warming_up" if not readiness["ready"] else "degraded"),
+            "mongo": mongo_ok,
+            "users_email_unique": users_email_unique,
+            **readiness,
+            "password_hash_queue_depth": password_hasher.pending,
+        },
+        status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={"Cache-Control": "no-store"},
+    )
+
+metrics.register_gauge("app_ready", "1 once warm-up has finished", lambda: int(readiness["ready"]))
+metrics.register_gauge("password_hash_queue_depth", "bcrypt calls queued or running", lambda: password_hasher.pending)
+metrics.register_gauge("password_hash_rejected", "bcrypt calls rejected because the queue was full", lambda: password_hasher.rejected)
+metrics.register_gauge("user_cache_hit_ratio", "Authenticated-user cache hit ratio", lambda: user_cache.stats()["hit_ratio"])
+metrics.register_gauge("user_lookup_dedup_ratio", "Share of user lookups served by an in-flight identical query", lambda: user_lookups.stats()["dedup_ratio"])
+metrics.register_gauge("itinerary_lookup_dedup_ratio", "Share of itinerary lookups served by an in-flight identical query", lambda: itinerary_lookups.stats()["dedup_ratio"])
+metrics.register_gauge("jwt_claims_cache_hit_ratio", "Verified-JWT cache hit ratio", lambda: jwt_claims_cache.stats()["hit_ratio"])
+metrics.register_gauge("survey_write_behind_queued", "Survey responses waiting to be written", lambda: survey_writer.stats()["queued"])
+
+# Prometheus scrape endpoint for this worker
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    return metrics.render()
+
+# In-process cache counters for this worker
+@app.get("/api/cache-stats")
+async def cache_stats():
+    return {
+        "user_cache": user_cache.stats(),
+        "jwt_claims_cache": jwt_claims_cache.stats(),
+        "user_lookups": user_lookups.stats(),
+        "itinerary_lookups": itinerary_lookups.stats(),
+        "email_index": email_index.stats(),
+        "survey_writer": survey_writer.stats(),
+    }
+
 
 # --- All AI/chat/itinerary-related classes and code removed for minimal backend ---
 #             status_code=status.HTTP_403_FORBIDDEN,
@@ -495,37 +1623,199 @@ async def health_check():
 #         # @app.post("/api/generate-itinerary")
 #         # async def generate_itinerary(...):
 #         #     ...existing code...
-from bson import ObjectId
 itineraries_collection = db["itineraries"]
 
-# Get itinerary details (secured)
-@app.get("/api/itinerary/{itinerary_id}")
-async def get_itinerary_details(itinerary_id: str, current_user: dict = Depends(get_current_user)):
-    if not ObjectId.is_valid(itinerary_id):
-        raise HTTPException(status_code=400, detail="Invalid itinerary ID")
-    itinerary = await itineraries_collection.find_one({"_id": ObjectId(itinerary_id)})
+# Run itinerary writes and their user counter updates in one transaction (needs a replica set)
+MONGO_TRANSACTIONS = os.getenv("MONGO_TRANSACTIONS", "false").lower() == "true"
+# Without transactions, send the itinerary insert and the counter update as one ordered
+# client-level bulkWrite where the server has it (MongoDB 8.0+, wire version 25)
+MONGO_CLIENT_BULK_WRITE = os.getenv("MONGO_CLIENT_BULK_WRITE", "true").lower() == "true"
+CLIENT_BULK_WRITE_WIRE_VERSION = 25
+client_bulk_write = False  # set by probe_mongo()
+
+async def probe_mongo():
+    """Ping MongoDB and note whether it takes client-level bulk writes"""
+    global client_bulk_write
+    hello = await client_mongo.admin.command("ismaster")
+    client_bulk_write = MONGO_CLIENT_BULK_WRITE and hello.get("maxWireVersion", 0) >= CLIENT_BULK_WRITE_WIRE_VERSION
+
+# Itineraries are stored in the compact v2 format (itinerary_store.py). Bodies whose JSON
+# is at least ITINERARY_ZSTD_MIN_SIZE bytes are zstd-compressed when zstandard is installed.
+ITINERARY_ZSTD = os.getenv("ITINERARY_ZSTD", "true").lower() == "true"
+ITINERARY_ZSTD_MIN_SIZE = int(os.getenv("ITINERARY_ZSTD_MIN_SIZE", 512))
+ITINERARY_ZSTD_LEVEL = int(os.getenv("ITINERARY_ZSTD_LEVEL", 3))
+
+def compact_itinerary_document(itinerary_document: dict) -> dict:
+    return compact_itinerary(
+        itinerary_document,
+        zstd_min_size=ITINERARY_ZSTD_MIN_SIZE if ITINERARY_ZSTD else None,
+        zstd_level=ITINERARY_ZSTD_LEVEL,
+    )
+
+@asynccontextmanager
+async def itinerary_transaction():
+    """Yield a session with an open transaction, or None when transactions are disabled"""
+    if not MONGO_TRANSACTIONS:
+        yield None
+        return
+    async with await client_mongo.start_session() as session:
+        async with session.start_transaction():
+            yield session
+
+async def create_itinerary_record(itinerary_document: dict, current_user: dict):
+    """Insert an itinerary (API shape, stored compact) and bump the owner's counters"""
+    counter_update = {"$inc": {"itineraries_created": 1}}
+    if not current_user.get("has_premium_subscription", False):
+        counter_update["$set"] = {"free_itinerary_used": True}
+    itinerary_document.setdefault("_id", ObjectId())
+    stored = compact_itinerary_document(itinerary_document)
+    async with itinerary_transaction() as session:
+        if session is None and client_bulk_write:
+            # One round trip; ordered, so the update is skipped if the insert fails
+            await client_mongo.bulk_write([
+                InsertOne(stored, namespace=itineraries_collection.full_name),
+                UpdateOne({"email": current_user["email"]}, counter_update, namespace=users_collection.full_name),
+            ], ordered=True)
+        else:
+            # Insert first: without a transaction a failed insert must not charge the user
+            await itineraries_collection.insert_one(stored, session=session)
+            await users_collection.update_one({"email": current_user["email"]}, counter_update, session=session)
+    invalidate_user(current_user["email"])
+    return itinerary_document["_id"]
+
+async def delete_itinerary_record(itinerary_id: ObjectId, user_email: str) -> bool:
+    """Delete an itinerary owned by `user_email`; False if no such itinerary is theirs"""
+    async with itinerary_transaction() as session:
+        deleted = await itineraries_collection.find_one_and_delete(
+            {"_id": itinerary_id, "user_email": user_email},
+            projection={"_id": 1},
+            session=session,
+        )
+        if deleted is None:
+            return False
+        await users_collection.update_one(
+            {"email": user_email},
+            {"$inc": {"itineraries_created": -1}},
+            session=session,
+        )
+    invalidate_user(user_email)
+    itinerary_lookups.forget(("head", itinerary_id))
+    itinerary_lookups.forget(("full", itinerary_id))
+    return True
+
+def itinerary_etag(itinerary: dict) -> str:
+    return make_etag(itinerary["_id"], itinerary.get("updated_at") or itinerary.get("created_at"))
+
+def check_itinerary_access(itinerary: Optional[dict], current_user: dict):
     if not itinerary:
         raise HTTPException(status_code=404, detail="Itinerary not found")
     if itinerary.get("user_email") != current_user["email"]:
         raise HTTPException(status_code=403, detail="Not authorized to view this itinerary")
-    itinerary["_id"] = str(itinerary["_id"])
-    return itinerary
+
+async def load_itinerary_head(itinerary_id: ObjectId):
+    """Just the fields needed for the access check and the ETag"""
+    return await itineraries_collection.find_one(
+        {"_id": itinerary_id},
+        {"user_email": 1, "created_at": 1, "updated_at": 1},
+    )
+
+async def load_itinerary(itinerary_id: ObjectId):
+    return expand_itinerary(await itineraries_collection.find_one({"_id": itinerary_id}))
+
+# Get itinerary details (secured)
+@app.get("/api/itinerary/{itinerary_id}")
+async def get_itinerary_details(itinerary_id: str, request: Request, current_user: dict = Depends(get_current_user)):
+    if not ObjectId.is_valid(itinerary_id):
+        raise HTTPException(status_code=400, detail="Invalid itinerary ID")
+    if request.headers.get("if-none-match"):
+        # Revalidate with the version fields only, without loading the itinerary body
+        head = await itinerary_lookups.do(("head", ObjectId(itinerary_id)), load_itinerary_head, ObjectId(itinerary_id))
+        check_itinerary_access(head, current_user)
+        etag = itinerary_etag(head)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+    itinerary = await itinerary_lookups.do(("full", ObjectId(itinerary_id)), load_itinerary, ObjectId(itinerary_id))
+    check_itinerary_access(itinerary, current_user)
+    # Returned as-is: FastJSONResponse renders ObjectId and datetime itself
+    return FastJSONResponse(
+        itinerary,
+        headers={"ETag": itinerary_etag(itinerary), "Cache-Control": CONDITIONAL_CACHE_CONTROL},
+    )
+
+# Summary fields for the itinerary list, all served from the covering index
+ITINERARY_SUMMARY_PROJECTION = {
+    "_id": 1,
+    "destination": 1,
+    "dates": 1,
+    "travelers": 1,
+    "title": 1,
+    "itinerary_data.personalized_title": 1,  # documents not migrated to the compact format
+    "hero": 1,
+    "itinerary_data.hero_image_url": 1,
+    "created_at": 1,
+}
+
+def encode_itinerary_cursor(created_at: datetime.datetime, itinerary_id: ObjectId) -> str:
+    raw = f"{created_at.isoformat()}|{itinerary_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_itinerary_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, itinerary_id = raw.split("|")
+        return datetime.datetime.fromisoformat(created_at), ObjectId(itinerary_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+# List the current user's itineraries, newest first (secured, keyset-paginated)
+@app.get("/api/my-itineraries")
+async def get_my_itineraries(
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    current_user: dict = Depends(get_current_user),
+):
+    query = {"user_email": current_user["email"]}
+    if cursor:
+        created_at, itinerary_id = decode_itinerary_cursor(cursor)
+        query["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": itinerary_id}},
+        ]
+    docs = await itineraries_collection.find(query, ITINERARY_SUMMARY_PROJECTION) \
+        .sort([("created_at", DESCENDING), ("_id", DESCENDING)]) \
+        .limit(limit + 1) \
+        .to_list(length=limit + 1)
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_itinerary_cursor(docs[-1]["created_at"], docs[-1]["_id"])
+    itineraries = []
+    for doc in docs:
+        created_at = doc.get("created_at")
+        if created_at and created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=datetime.timezone.utc)
+        itineraries.append({
+            "itinerary_id": str(doc["_id"]),
+            "destination": doc.get("destination", ""),
+            "destination_name": doc.get("destination", ""),
+            "dates": doc.get("dates", ""),
+            "travelers": doc.get("travelers", ""),
+            "personalized_title": doc.get("title", doc.get("itinerary_data", {}).get("personalized_title", "")),
+            "hero_image_url": doc.get("hero", doc.get("itinerary_data", {}).get("hero_image_url", "")),
+            "created_at": created_at.isoformat() if created_at else None,
+        })
+    return {"itineraries": itineraries, "next_cursor": next_cursor}
 
 # Delete itinerary (secured)
 @app.delete("/api/itinerary/{itinerary_id}")
 async def delete_itinerary(itinerary_id: str, current_user: dict = Depends(get_current_user)):
     if not ObjectId.is_valid(itinerary_id):
         raise HTTPException(status_code=400, detail="Invalid itinerary ID")
-    itinerary = await itineraries_collection.find_one({"_id": ObjectId(itinerary_id)})
-    if not itinerary:
+    if not await delete_itinerary_record(ObjectId(itinerary_id), current_user["email"]):
+        # Only the failure path pays for telling "missing" apart from "not yours"
+        if await itineraries_collection.find_one({"_id": ObjectId(itinerary_id)}, {"_id": 1}):
+            raise HTTPException(status_code=403, detail="Not authorized to delete this itinerary")
         raise HTTPException(status_code=404, detail="Itinerary not found")
-    if itinerary.get("user_email") != current_user["email"]:
-        raise HTTPException(status_code=403, detail="Not authorized to delete this itinerary")
-    await itineraries_collection.delete_one({"_id": ObjectId(itinerary_id)})
-    await users_collection.update_one(
-        {"email": current_user["email"]},
-        {"$inc": {"itineraries_created": -1}}
-    )
     return {"message": "Itinerary deleted"}
 
 # Generate itinerary (secured, minimal logic)
@@ -563,20 +1853,9 @@ async def generate_itinerary(req: ItineraryRequest, current_user: dict = Depends
         "created_at": datetime.datetime.now(datetime.timezone.utc),
         "updated_at": datetime.datetime.now(datetime.timezone.utc)
     }
-    result = await itineraries_collection.insert_one(itinerary_document)
-    itinerary_id = str(result.inserted_id)
+    itinerary_id = str(await create_itinerary_record(itinerary_document, current_user))
     itinerary_data["itinerary_id"] = itinerary_id
-    if not current_user.get("has_premium_subscription", False):
-        await users_collection.update_one(
-            {"email": current_user["email"]},
-            {"$set": {"free_itinerary_used": True}, "$inc": {"itineraries_created": 1}}
-        )
-    else:
-        await users_collection.update_one(
-            {"email": current_user["email"]},
-            {"$inc": {"itineraries_created": 1}}
-        )
-    return {"message": "Itinerary generated", "itinerary_id": itinerary_id, "itinerary": itinerary_data}
+    return FastJSONResponse({"message": "Itinerary generated", "itinerary_id": itinerary_id, "itinerary": itinerary_data})
 #         if not itinerary_data.get("personalized_title") or itinerary_data.get("personalized_title") in [None, "", "undefined"]:
 #             itinerary_data["personalized_title"] = f"Trip to {itinerary_data['destination_name']}"
 
@@ -0,0 +1,23 @@
+"""
+Rebuild the per-day survey counters (survey_daily_stats) from survey_responses
+Run it once after deploying the analytics counters, or whenever they drift.
+Responses submitted while it runs may be missed, so pause survey traffic first.
+
+Usage: python backfill_survey_stats.py
+"""
+
+import asyncio
+import time
+
+import app
+
+
+async def main():
+    start = time.perf_counter()
+    scanned = await app.rebuild_survey_stats()
+    days = await app.survey_daily_stats_collection.count_documents({})
+    print(f"Rebuilt {days} daily summaries from {scanned} survey responses in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
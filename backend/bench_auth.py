@@ -0,0 +1,43 @@
+"""
+Benchmark for per-request authentication overhead in app.py
+Compares get_current_user with and without the verified-JWT claims cache.
+
+Usage: python bench_auth.py [iterations]
+"""
+
+import asyncio
+import sys
+import time
+
+import app
+
+
+async def time_auth(token: str, iterations: int, use_cache: bool) -> float:
+    """Return the mean microseconds spent in get_current_user per request"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        if not use_cache:
+            app.jwt_claims_cache.clear()
+        await app.get_current_user(token)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+async def main(iterations: int):
+    email = "bench@example.com"
+    # Keep the user lookup in memory so only token handling is measured
+    app.user_cache.set(email, {"email": email, "name": "Bench"}, ttl=3600)
+    token = app.create_access_token(data={"sub": email})
+
+    await time_auth(token, 100, use_cache=False)  # warm-up
+    uncached = await time_auth(token, iterations, use_cache=False)
+    cached = await time_auth(token, iterations, use_cache=True)
+
+    print(f"Iterations:          {iterations}")
+    print(f"Without JWT cache:   {uncached:8.2f} us/request")
+    print(f"With JWT cache:      {cached:8.2f} us/request")
+    print(f"Speed-up:            {uncached / cached:8.1f}x")
+    print(f"Cache stats:         {app.jwt_claims_cache.stats()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000))
@@ -0,0 +1,159 @@
+"""
+Wire bytes and server CPU per chat turn: HTTP (full history every turn) vs /ws/chat
+Plays the 7-question trip-planning flow against simplified_app.py running under
+uvicorn in a subprocess, with the fake Groq server from loadtest.py. Over HTTP
+each turn resends the system prompt and whole conversation, as the frontend
+does; over the WebSocket the client sends them once and then only new messages.
+Server CPU is the subprocess's user+system time from /proc (Linux only).
+Streamed and non-streamed replies are measured separately: relaying tokens
+costs more CPU than the request parsing that sessions save.
+
+Usage: python bench_chat_session.py [conversations] [llm_latency_seconds]
+"""
+
+import asyncio
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+import urllib.request
+
+import httpx
+from websockets.asyncio.client import connect
+
+import loadtest
+from startup_profile import BACKEND_DIR, free_port
+
+ANSWERS = ["Goa", "December 15-18", "4 friends", "beaches and nightlife", "vegetarian", "mid-range", "relaxed"]
+GREETING = {"sender": "system", "text": "Hey there! I'm The Modern Chanakya, your personal travel buddy! 🇮🇳 Where in India would you like to go?"}
+FRONTEND_PAGE = os.path.join(BACKEND_DIR, "..", "frontend", "src", "app", "preferences", "page.tsx")
+
+
+def frontend_system_prompt() -> str:
+    """The system prompt the preferences page sends with every turn"""
+    try:
+        with open(FRONTEND_PAGE, encoding="utf-8") as page:
+            match = re.search(r"const systemPrompt = `(.*?)`;", page.read(), re.DOTALL)
+    except OSError:
+        match = None
+    return match.group(1) if match else GREETING["text"] * 10
+
+
+def cpu_seconds(pid: int) -> float:
+    with open(f"/proc/{pid}/stat") as stat:
+        fields = stat.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def http_bytes(start_line: str, headers, body: int) -> int:
+    return len(start_line) + 2 + sum(len(name) + len(value) + 4 for name, value in headers) + 2 + body
+
+
+def frame_bytes(payload: int, masked: bool) -> int:
+    header = 2 + (2 if payload > 125 else 0) + (6 if payload > 65535 else 0)
+    return header + (4 if masked else 0) + payload
+
+
+async def http_conversation(client: httpx.AsyncClient, path: str, system_prompt: str) -> tuple:
+    sent = received = 0
+    history = [GREETING]
+    for answer in ANSWERS:
+        history.append({"sender": "user", "text": answer})
+        body = {"system_prompt": system_prompt, "conversation_history": history, "user_name": "Traveler"}
+        response = await client.post(path, json=body)
+        assert response.status_code == 200, response.status_code
+        request = response.request
+        sent += http_bytes(f"POST {path} HTTP/1.1", request.headers.raw, len(request.content))
+        received += http_bytes("HTTP/1.1 200 OK", response.headers.raw, response.num_bytes_downloaded)
+        if path.endswith("/stream"):
+            reply = json.loads(response.text.rsplit("data: ", 1)[1])["response"]
+        else:
+            reply = response.json()["response"]
+        history.append({"sender": "system", "text": reply})
+    return sent, received
+
+
+async def websocket_conversation(url: str, system_prompt: str, stream: bool) -> tuple:
+    async with connect(url, compression=None) as ws:
+        sent = http_bytes("GET /ws/chat HTTP/1.1", ws.request.headers.raw_items(), 0)
+        received = http_bytes("HTTP/1.1 101 Switching Protocols", ws.response.headers.raw_items(), 0)
+
+        async def send(message: dict):
+            nonlocal sent
+            payload = json.dumps(message)
+            sent += frame_bytes(len(payload.encode()), masked=True)
+            await ws.send(payload)
+
+        async def receive() -> dict:
+            nonlocal received
+            payload = await ws.recv()
+            received += frame_bytes(len(payload.encode()), masked=False)
+            return json.loads(payload)
+
+        await send({"type": "start", "system_prompt": system_prompt, "user_name": "Traveler", "conversation_history": [GREETING]})
+        assert (await receive())["type"] == "session"
+        for answer in ANSWERS:
+            await send({"type": "message", "text": answer, "stream": stream})
+            while (message := await receive())["type"] == "token":
+                pass
+            assert message["type"] == "done", message
+    return sent, received
+
+
+async def measure(label: str, pid: int, conversations: int, one) -> None:
+    await one()  # warm up
+    cpu_before = cpu_seconds(pid)
+    start = time.perf_counter()
+    sent = received = 0
+    for _ in range(conversations):
+        conversation_sent, conversation_received = await one()
+        sent += conversation_sent
+        received += conversation_received
+    wall = time.perf_counter() - start
+    cpu = cpu_seconds(pid) - cpu_before
+    turns = conversations * len(ANSWERS)
+    print(f"{label:<34} sent {sent / conversations:7.0f} B  received {received / conversations:7.0f} B per conversation  "
+          f"server CPU {cpu / turns * 1000:5.2f} ms/turn  wall {wall / turns * 1000:6.1f} ms/turn")
+
+
+async def main(conversations: int, latency: float):
+    groq_url = loadtest.start_fake_groq(latency)
+    port = free_port()
+    env = {**os.environ, "GROQ_BASE_URL": groq_url, "GROQ_API_KEY": os.getenv("GROQ_API_KEY", "bench-fake-key"),
+           "ITINERARY_CACHE_PATH": ""}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "simplified_app:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL,
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        while True:
+            try:
+                with urllib.request.urlopen(f"{base_url}/api/health", timeout=1):
+                    break
+            except OSError:
+                time.sleep(0.05)
+        ws_url = base_url.replace("http", "ws", 1) + "/ws/chat"
+        system_prompt = frontend_system_prompt()
+        print(f"{conversations} conversations x {len(ANSWERS)} turns, system prompt {len(system_prompt.encode())} B, "
+              f"fake Groq latency {latency}s")
+        async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+            for label, path in (("POST /api/chat-conversation", "/api/chat-conversation"),
+                                ("POST /api/chat-conversation/stream", "/api/chat-conversation/stream")):
+                await measure(label, server.pid, conversations,
+                              lambda path=path: http_conversation(client, path, system_prompt))
+        for label, stream in (("ws /ws/chat", False), ("ws /ws/chat (streamed)", True)):
+            await measure(label, server.pid, conversations,
+                          lambda stream=stream: websocket_conversation(ws_url, system_prompt, stream))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 30,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 0.05,
+    ))
@@ -0,0 +1,70 @@
+"""
+Time-to-first-byte benchmark for /api/chat-conversation vs its SSE variant
+Runs simplified_app.py under uvicorn against the fake Groq server from
+loadtest.py, which streams the reply over `llm_latency` seconds. Real sockets
+are used so streamed bytes are timed as they arrive.
+
+Usage: python bench_chat_stream.py [requests] [llm_latency_seconds]
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import httpx
+
+import loadtest
+
+PAYLOAD = {
+    "system_prompt": "You are The Modern Chanakya, a travel planner.",
+    "conversation_history": [{"sender": "user", "text": "I want to visit Goa"}],
+    "user_name": "Bench",
+}
+
+
+async def timed_request(client: httpx.AsyncClient, path: str, first_marker: bytes):
+    """(seconds until `first_marker` arrived, seconds until the response ended)"""
+    start = time.perf_counter()
+    first = None
+    received = b""
+    async with client.stream("POST", path, json=PAYLOAD) as response:
+        assert response.status_code == 200, response.status_code
+        async for chunk in response.aiter_raw():
+            received += chunk
+            if first is None and first_marker in received:
+                first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+def report(label: str, samples: list):
+    first = sorted(sample[0] for sample in samples)
+    total = sorted(sample[1] for sample in samples)
+    p95 = lambda values: values[min(len(values) - 1, int(len(values) * 0.95))]
+    print(f"{label:<32} first content p50 {statistics.median(first) * 1000:7.1f} ms  p95 {p95(first) * 1000:7.1f} ms  "
+          f"complete p50 {statistics.median(total) * 1000:7.1f} ms")
+
+
+async def main(requests: int, latency: float):
+    os.environ["GROQ_BASE_URL"] = loadtest.start_fake_groq(latency)
+    os.environ.setdefault("GROQ_API_KEY", "bench-fake-key")
+    import simplified_app
+
+    base_url = loadtest.serve_in_background(simplified_app.app)
+    print(f"{requests} sequential chat requests, fake Groq generation time {latency}s")
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        await timed_request(client, "/api/chat-conversation", b"response")  # warm up both paths
+        await timed_request(client, "/api/chat-conversation/stream", b"event: token")
+        for label, path, marker in (
+            ("/api/chat-conversation", "/api/chat-conversation", b"response"),
+            ("/api/chat-conversation/stream", "/api/chat-conversation/stream", b"event: token"),
+        ):
+            report(label, [await timed_request(client, path, marker) for _ in range(requests)])
+
+
+if __name__ == "__main__":
+    asyncio.run(main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 20,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 1.0,
+    ))
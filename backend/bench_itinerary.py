@@ -0,0 +1,96 @@
+"""
+Benchmark for itinerary create/delete round trips in app.py
+Times the previous sequential writes against create_itinerary_record /
+delete_itinerary_record on the MongoDB configured in MONGODB_URI.
+Set MONGO_TRANSACTIONS=true to measure the transactional variant. On MongoDB 8.0+
+the non-transactional create is one client-level bulkWrite; MONGO_CLIENT_BULK_WRITE=false
+measures the sequential insert and update instead.
+
+Usage: python bench_itinerary.py [iterations]
+"""
+
+import asyncio
+import datetime
+import statistics
+import sys
+import time
+
+import app
+
+BENCH_EMAIL = "bench-itinerary@example.com"
+
+
+def make_document():
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return {
+        "user_email": BENCH_EMAIL,
+        "destination": "Goa",
+        "itinerary_data": {"destination": "Goa", "personalized_title": "Trip to Goa"},
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+async def legacy_create(user):
+    result = await app.itineraries_collection.insert_one(make_document())
+    await app.users_collection.update_one(
+        {"email": user["email"]},
+        {"$set": {"free_itinerary_used": True}, "$inc": {"itineraries_created": 1}}
+    )
+    return result.inserted_id
+
+
+async def legacy_delete(itinerary_id, user):
+    itinerary = await app.itineraries_collection.find_one({"_id": itinerary_id})
+    assert itinerary["user_email"] == user["email"]
+    await app.itineraries_collection.delete_one({"_id": itinerary_id})
+    await app.users_collection.update_one({"email": user["email"]}, {"$inc": {"itineraries_created": -1}})
+
+
+async def new_create(user):
+    return await app.create_itinerary_record(make_document(), user)
+
+
+async def new_delete(itinerary_id, user):
+    assert await app.delete_itinerary_record(itinerary_id, user["email"])
+
+
+async def measure(create, delete, user, iterations):
+    create_ms, delete_ms = [], []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        itinerary_id = await create(user)
+        create_ms.append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        await delete(itinerary_id, user)
+        delete_ms.append((time.perf_counter() - start) * 1000)
+    return create_ms, delete_ms
+
+
+def summary(samples):
+    samples = sorted(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    return f"p50 {statistics.median(samples):7.2f} ms  p99 {p99:7.2f} ms"
+
+
+async def main(iterations: int):
+    await app.probe_mongo()
+    await app.users_collection.update_one(
+        {"email": BENCH_EMAIL},
+        {"$setOnInsert": {"email": BENCH_EMAIL, "name": "Bench", "itineraries_created": 0}},
+        upsert=True,
+    )
+    user = await app.users_collection.find_one({"email": BENCH_EMAIL})
+    await measure(new_create, new_delete, user, 10)  # warm the connection pool
+
+    print(f"Iterations: {iterations}  transactions: {app.MONGO_TRANSACTIONS}  client bulk write: {app.client_bulk_write}")
+    for label, create, delete in (("before", legacy_create, legacy_delete), ("after", new_create, new_delete)):
+        create_ms, delete_ms = await measure(create, delete, user, iterations)
+        print(f"{label:>6} create  {summary(create_ms)}")
+        print(f"{label:>6} delete  {summary(delete_ms)}")
+
+    await app.users_collection.delete_one({"email": BENCH_EMAIL})
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200))
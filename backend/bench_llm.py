@@ -0,0 +1,97 @@
+"""
+Benchmark for concurrent LLM requests in simplified_app.py
+Fires concurrent /api/generate-itinerary requests in-process against the fake
+Groq server from loadtest.py. Compares them with the previous behaviour: the
+synchronous Groq client called inside the handler, which blocked the event
+loop for every completion. Also times /api/health while the LLM calls are
+running, to show whether the loop stays responsive.
+
+Usage: python bench_llm.py [concurrency] [llm_latency_seconds]
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import httpx
+
+import loadtest
+
+MESSAGES = [{"sender": "user", "text": text} for text in ("Goa", "December", "2 adults", "beaches", "seafood", "mid-range", "relaxed")]
+
+
+def summary(label: str, wall: float, latencies: list, count: int):
+    latencies = sorted(latencies)
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(f"{label:<28} {count / wall:8.1f} req/s  wall {wall:6.2f} s  "
+          f"p50 {statistics.median(latencies) * 1000:8.1f} ms  p95 {p95 * 1000:8.1f} ms")
+
+
+async def probe_health(client: httpx.AsyncClient, stop: asyncio.Event) -> list:
+    """Completion times of /api/health requests issued back to back until `stop` is set"""
+    completed = []
+    while not stop.is_set():
+        await client.get("/api/health")
+        completed.append(time.perf_counter())
+        await asyncio.sleep(0.01)
+    return completed
+
+
+async def run(label: str, client: httpx.AsyncClient, one, concurrency: int):
+    """Start `concurrency` calls at once; latency is each call's completion time since the start"""
+    stop = asyncio.Event()
+    prober = asyncio.create_task(probe_health(client, stop))
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+
+    async def timed():
+        await one()
+        return time.perf_counter() - start
+
+    latencies = await asyncio.gather(*(timed() for _ in range(concurrency)))
+    end = time.perf_counter()
+    stop.set()
+    probes = [t for t in await prober if t <= end]
+    summary(label, end - start, latencies, concurrency)
+    # How long the event loop went without answering a health check
+    marks = [start, *probes, end]
+    stall = max(b - a for a, b in zip(marks, marks[1:]))
+    print(f"{'':<28} /api/health answered {len(probes)} times, longest gap {stall * 1000:.0f} ms")
+
+
+async def main(concurrency: int, latency: float):
+    os.environ["GROQ_BASE_URL"] = loadtest.start_fake_groq(latency)
+    os.environ.setdefault("GROQ_API_KEY", "bench-fake-key")
+    import simplified_app
+    from groq import Groq
+
+    sync_client = Groq(api_key=os.environ["GROQ_API_KEY"], max_retries=0)
+
+    async def blocking_call():
+        # What the handlers used to do: a synchronous completion inside async code
+        sync_client.chat.completions.create(
+            model="openai/gpt-oss-20b",
+            messages=[{"role": "user", "content": "itinerary"}],
+            response_format={"type": "json_object"},
+        )
+
+    transport = httpx.ASGITransport(app=simplified_app.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        async def endpoint_call():
+            response = await client.post("/api/generate-itinerary", json={"messages": MESSAGES})
+            assert response.status_code == 200, response.status_code
+
+        print(f"{concurrency} concurrent itinerary requests, fake Groq latency {latency}s, "
+              f"LLM_MAX_CONCURRENCY={simplified_app.LLM_MAX_CONCURRENCY}")
+        await run("sync client (before)", client, blocking_call, concurrency)
+        await run("async pool (after)", client, endpoint_call, concurrency)
+        print(f"pool: {simplified_app.llm_pool.stats()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 16,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 0.5,
+    ))
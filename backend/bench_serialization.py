@@ -0,0 +1,104 @@
+"""
+Benchmark for itinerary response serialization and compression
+Compares FastAPI's default path (str(_id) + jsonable_encoder + json.dumps)
+with FastJSONResponse, and reports bytes on the wire per encoding.
+
+Usage: python bench_serialization.py [days] [iterations]
+"""
+
+import datetime
+import gzip
+import statistics
+import sys
+import time
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+import fast_responses
+from fast_responses import FastJSONResponse
+
+
+def make_itinerary_document(days: int) -> dict:
+    """A stored itinerary shaped like simplified_app's LLM output"""
+    meal = {"restaurant": "Fisherman's Wharf", "dish": "Goan fish curry with rice", "estimated_cost": "₹600-900"}
+    activity = {"activity": "Walk through the Latin Quarter", "location": "Fontainhas, Panaji", "duration": "2 hours"}
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return {
+        "_id": ObjectId(),
+        "user_email": "traveler@example.com",
+        "destination": "Goa",
+        "created_at": now,
+        "updated_at": now,
+        "itinerary_data": {
+            "destination_name": "Goa",
+            "personalized_title": "Sun, Sand and Susegad",
+            "trip_overview": {
+                "destination_insights": "Goa blends Portuguese heritage with Konkan coastal life. " * 4,
+                "weather_during_visit": "Warm and humid, 24-32°C",
+                "seasonal_context": "Peak season with beach shacks fully open.",
+                "local_customs_to_know": ["Dress modestly at churches and temples"] * 4,
+            },
+            "daily_itinerary": [
+                {
+                    "date": (now + datetime.timedelta(days=i)).date().isoformat(),
+                    "day_number": f"Day {i + 1}",
+                    "theme": "Heritage and beaches",
+                    "breakfast": dict(meal),
+                    "morning_activities": [dict(activity) for _ in range(3)],
+                    "lunch": dict(meal),
+                    "afternoon_activities": [dict(activity) for _ in range(3)],
+                    "dinner": dict(meal),
+                }
+                for i in range(days)
+            ],
+            "practical_tips": ["Rent a scooter for short hops between beaches"] * 6,
+        },
+    }
+
+
+def default_render(document: dict) -> bytes:
+    document = dict(document)
+    document["_id"] = str(document["_id"])
+    return JSONResponse(jsonable_encoder(document)).body
+
+
+def fast_render(document: dict) -> bytes:
+    return FastJSONResponse(document).body
+
+
+def time_us(fn, arg, iterations: int):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn(arg)
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return statistics.median(samples), samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+
+
+def main(days: int, iterations: int):
+    document = make_itinerary_document(days)
+    print(f"Itinerary with {days} days, {iterations} iterations")
+
+    for label, fn in (("jsonable_encoder + json", default_render), ("FastJSONResponse", fast_render)):
+        p50, p99 = time_us(fn, document, iterations)
+        print(f"{label:<26} p50 {p50:9.1f} us  p99 {p99:9.1f} us")
+
+    body = fast_render(document)
+    encoders = [("gzip", lambda data: gzip.compress(data, compresslevel=6))]
+    if fast_responses.brotli is not None:
+        encoders.append(("br", lambda data: fast_responses.brotli.compress(data, quality=4)))
+    print(f"{'identity':<26} {len(body):9d} bytes")
+    for label, compress in encoders:
+        p50, p99 = time_us(compress, body, iterations)
+        size = len(compress(body))
+        print(f"{label:<26} {size:9d} bytes ({size / len(body):.0%})  p50 {p50:9.1f} us  p99 {p99:9.1f} us")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 7,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 2000,
+    )
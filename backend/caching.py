@@ -0,0 +1,284 @@
+"""
+In-process caching helpers shared by app.py and simplified_app.py
+"""
+
+import asyncio
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import orjson
+
+
+class TTLCache:
+    """In-process LRU cache whose entries also expire after `ttl` seconds.
+
+    Not thread-safe; it is only touched from the event loop.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._data[key]
+        self.misses += 1
+        return default
+
+    def set(self, key, value, ttl: float = None):
+        self._data[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class SingleFlight:
+    """Shares one in-flight call between concurrent callers asking for the same key.
+
+    The call runs in its own task and callers await it through asyncio.shield, so a
+    caller that is cancelled (e.g. its client disconnected) only stops waiting and
+    the others still get the result. Once every caller has gone the task is
+    cancelled. Results are shared objects: treat them as read-only.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.calls = 0
+        self.executions = 0
+        self.abandoned = 0
+        self._flights = {}  # key -> [task, waiters]
+
+    async def do(self, key, fn, *args):
+        self.calls += 1
+        if not self.enabled:
+            self.executions += 1
+            return await fn(*args)
+        flight = self._flights.get(key)
+        if flight is None:
+            self.executions += 1
+            flight = self._flights[key] = [asyncio.ensure_future(fn(*args)), 0]
+            flight[0].add_done_callback(lambda task, key=key: self._finished(key, task))
+        task = flight[0]
+        flight[1] += 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            flight[1] -= 1
+            if flight[1] == 0 and not task.done():
+                self.abandoned += 1
+                if self._flights.get(key) is flight:  # forget() may have let a newer call in since
+                    del self._flights[key]
+                task.cancel()
+
+    def _finished(self, key, task):
+        flight = self._flights.get(key)
+        if flight is not None and flight[0] is task:
+            del self._flights[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here in case every caller was cancelled first
+
+    def forget(self, key):
+        """Make later callers start a fresh call, e.g. after a write made the in-flight one stale"""
+        self._flights.pop(key, None)
+
+    def is_current(self, key) -> bool:
+        """True inside the call for `key` unless forget() has been called for it since"""
+        flight = self._flights.get(key)
+        return flight is not None and flight[0] is asyncio.current_task()
+
+    def stats(self) -> dict:
+        shared = self.calls - self.executions
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "shared": shared,
+            "dedup_ratio": round(shared / self.calls, 4) if self.calls else 0.0,
+            "in_flight": len(self._flights),
+            "abandoned": self.abandoned,
+        }
+
+
+class SQLiteCache:
+    """Byte values in a SQLite file, with per-entry expiry and a cap on their total size.
+
+    The file survives restarts and is shared by every worker pointing at it. Once
+    the values exceed `max_bytes`, the least recently read entries are deleted.
+    Calls do disk I/O, so run them off the event loop (asyncio.to_thread).
+    """
+
+    def __init__(self, path: str, max_bytes: int, ttl: float):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+            "expires_at REAL NOT NULL, used_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_used_at ON entries (used_at)")
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT value, expires_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is not None and row[1] > now:
+                self._db.execute("UPDATE entries SET used_at = ? WHERE key = ?", (now, key))
+                self.hits += 1
+                return row[0]
+            if row is not None:
+                self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: bytes, ttl: float = None):
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)", (key, value, len(value), expires_at, now)
+            )
+            self._evict(now)
+
+    def _evict(self, now: float):
+        self.evictions += self._db.execute("DELETE FROM entries WHERE expires_at <= ?", (now,)).rowcount
+        excess = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0] - self.max_bytes
+        if excess <= 0:
+            return
+        doomed = []
+        for key, size in self._db.execute("SELECT key, size FROM entries ORDER BY used_at"):
+            doomed.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        self._db.executemany("DELETE FROM entries WHERE key = ?", doomed)
+        self.evictions += len(doomed)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class TieredCache:
+    """A TTLCache in front of an optional SQLiteCache, loading each missing key once.
+
+    get_or_load() returns the cached value, or runs `load()` a single time for all
+    concurrent callers of the same key and stores its result in both tiers. An
+    exception from `load()` reaches every waiting caller and is not cached. Values
+    go to disk as orjson and come back as fresh objects; treat them as read-only.
+    Disk errors are logged and count as misses, so the disk tier is never fatal.
+    """
+
+    def __init__(self, memory: TTLCache, disk: SQLiteCache = None, enabled: bool = True):
+        self.memory = memory
+        self.disk = disk
+        self.enabled = enabled
+        self.flights = SingleFlight()
+        self.loads = 0
+
+    async def _disk_get(self, key):
+        if self.disk is None:
+            return None
+        try:
+            raw = await asyncio.to_thread(self.disk.get, key)
+        except sqlite3.Error as e:
+            print(f"Disk cache read failed: {e}")
+            return None
+        if raw is None:
+            return None
+        value = orjson.loads(raw)
+        self.memory.set(key, value)
+        return value
+
+    async def get(self, key):
+        """The cached value for `key`, or None"""
+        if not self.enabled:
+            return None
+        value = self.memory.get(key)
+        if value is None:
+            value = await self._disk_get(key)
+        return value
+
+    async def set(self, key, value):
+        if not self.enabled:
+            return
+        self.memory.set(key, value)
+        if self.disk is not None:
+            try:
+                await asyncio.to_thread(self.disk.set, key, orjson.dumps(value))
+            except (sqlite3.Error, TypeError) as e:
+                print(f"Disk cache write failed: {e}")
+
+    async def get_or_load(self, key, load):
+        if not self.enabled:
+            return await load()
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        return await self.flights.do(key, self._load, key, load)
+
+    async def _load(self, key, load):
+        value = await self._disk_get(key)
+        if value is None:
+            self.loads += 1
+            value = await load()
+            await self.set(key, value)
+        return value
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "memory": self.memory.stats(),
+            "disk": self.disk.stats() if self.disk is not None else None,
+            "loads": self.loads,
+            "single_flight": self.flights.stats(),
+        }
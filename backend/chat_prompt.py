@@ -0,0 +1,145 @@
+"""
+Token-budgeted prompt for /api/chat-conversation
+Only the most recent messages are sent verbatim. Earlier answers reach the
+model through a short "facts so far" slot (destination, dates, travelers,
+...), so the prompt stops growing with the length of the chat. Every part
+is clipped to its own share and the whole prompt to a token budget.
+"""
+
+CHAT_PROMPT_TEMPLATE = """
+{system_prompt}
+{facts}
+CONVERSATION SO FAR:
+{conversation}
+
+USER NAME: {user_name}
+
+Based on the conversation above, respond as "The Modern Chanakya" with the next appropriate message.
+
+RESPONSE GUIDELINES:
+- Keep responses SHORT and conversational (max 2-3 sentences)
+- Ask ONE clear, simple follow-up question
+- Use casual, friendly tone with emojis naturally
+- Be quick and to the point - like WhatsApp chatting
+- Reference their previous answers briefly to show you're listening
+- After 5-6 exchanges, if you have destination + dates + basic preferences, indicate readiness to generate itinerary
+
+CONVERSATION FLOW (6-7 questions max):
+1. Destination in India (where in Bharat?)
+2. Travel dates (when?)
+3. Who's traveling (solo/family/friends?)
+4. Main interests (what excites you most?)
+5. Food preferences (vegetarian/non-vegetarian/vegan/jain/any specific dietary needs?)
+6. Budget range (budget/mid-range/luxury?)
+7. Ready to generate if enough info, otherwise ask about pace/special requirements
+
+Keep it snappy and WhatsApp-friendly! No long paragraphs.
+
+IMPORTANT: Keep responses under 100 words. Be conversational, not formal.
+"""
+
+EARLIER_MESSAGES_NOTE = "(earlier messages omitted; their answers are in FACTS SO FAR)"
+
+SPEAKERS = {"user": "User", "system": "Assistant"}
+
+# UTF-8 bytes per token. The gpt-oss vocabulary averages 4+ characters per token
+# on English text, so this errs on the side of counting too many tokens.
+BYTES_PER_TOKEN = 4
+
+
+def count_tokens(text: str) -> int:
+    """Conservative token estimate; no tokenizer is needed at runtime"""
+    return -(-len(text.encode("utf-8")) // BYTES_PER_TOKEN)
+
+
+def clip(text: str, max_tokens: int) -> str:
+    """`text` cut to at most `max_tokens` tokens (by count_tokens), marked with an ellipsis if cut"""
+    if count_tokens(text) <= max_tokens:
+        return text
+    if max_tokens <= 1:
+        return ""
+    encoded = text.encode("utf-8")[:(max_tokens - 1) * BYTES_PER_TOKEN]
+    return encoded.decode("utf-8", errors="ignore").rstrip() + "…"
+
+
+class ChatPromptBuilder:
+    """Renders CHAT_PROMPT_TEMPLATE within `token_budget` tokens.
+
+    The last `window` messages are kept verbatim (each clipped to
+    `message_max_tokens`), newest first until the budget runs out; the latest
+    one is always kept, clipped to whatever room is left if need be. `facts`
+    values are clipped to `fact_max_tokens` and the client-supplied system
+    prompt to `system_prompt_max_tokens`.
+    """
+
+    def __init__(self, token_budget: int, window: int, message_max_tokens: int,
+                 fact_max_tokens: int, system_prompt_max_tokens: int):
+        self.token_budget = token_budget
+        self.window = window
+        self.message_max_tokens = message_max_tokens
+        self.fact_max_tokens = fact_max_tokens
+        self.system_prompt_max_tokens = system_prompt_max_tokens
+        self.builds = 0
+        self.messages_dropped = 0
+        self.last_tokens = 0
+        self.max_tokens = 0
+
+    def render_facts(self, facts: dict) -> str:
+        lines = [
+            f"- {field.replace('_', ' ').capitalize()}: {clip(' '.join(value.split()), self.fact_max_tokens)}"
+            for field, value in facts.items() if value
+        ]
+        if not lines:
+            return ""
+        return "\nFACTS SO FAR (from the traveler's answers):\n" + "\n".join(lines) + "\n"
+
+    def build(self, system_prompt: str, history: list, user_name: str, facts: dict, omitted: int = 0) -> str:
+        """`history` holds messages with .sender ("user" or "system") and .text.
+
+        `omitted` counts earlier messages the caller has already left out of it.
+        """
+        messages = [message for message in history if message.sender in SPEAKERS]
+        recent = messages[-self.window:] if self.window > 0 else []
+        lines = [f"{SPEAKERS[message.sender]}: {clip(message.text, self.message_max_tokens)}" for message in recent]
+
+        fields = {
+            "system_prompt": clip(system_prompt, self.system_prompt_max_tokens),
+            "facts": self.render_facts(facts),
+            "user_name": clip(user_name, self.fact_max_tokens),
+        }
+        remaining = self.token_budget - count_tokens(CHAT_PROMPT_TEMPLATE.format(conversation="", **fields))
+        if messages or omitted:
+            remaining -= count_tokens(EARLIER_MESSAGES_NOTE) + 1  # room in case anything is dropped
+
+        kept = []
+        for line in reversed(lines):
+            cost = count_tokens(line) + 1  # and its newline
+            if cost > remaining:
+                if kept:
+                    break
+                line = clip(line, remaining - 1)
+                cost = remaining
+            kept.append(line)
+            remaining -= cost
+        kept.reverse()
+        dropped = omitted + len(messages) - len(kept)
+        if dropped:
+            kept.insert(0, EARLIER_MESSAGES_NOTE)
+
+        prompt = CHAT_PROMPT_TEMPLATE.format(conversation="\n".join(kept), **fields)
+        tokens = count_tokens(prompt)
+        self.builds += 1
+        self.messages_dropped += dropped
+        self.last_tokens = tokens
+        self.max_tokens = max(self.max_tokens, tokens)
+        return prompt
+
+    def stats(self) -> dict:
+        return {
+            "token_budget": self.token_budget,
+            "window": self.window,
+            "builds": self.builds,
+            "messages_dropped": self.messages_dropped,
+            "last_tokens": self.last_tokens,
+            "max_tokens": self.max_tokens,
+        }
@@ -0,0 +1,162 @@
+"""
+Server-side chat sessions for the /ws/chat WebSocket in simplified_app.py
+The client sends its system prompt and user name once, then only each new
+message; the server keeps what the next prompt needs. A session holds the
+answers to the chat's fixed questions (the "facts so far") and the last
+`window` messages, so its size does not grow with the chat.
+
+Sessions live in memory, at most `max_sessions` of them, least recently used
+first out, and are dropped after `idle_ttl` seconds without a turn. Given a
+Mongo collection, each session is also saved after every turn so it can be
+resumed after a restart or on another worker; a TTL index on updated_at
+removes idle ones there.
+"""
+
+import asyncio
+import datetime
+import secrets
+import time
+from collections import OrderedDict, deque, namedtuple
+
+SessionMessage = namedtuple("SessionMessage", "sender text")
+
+
+class ChatSession:
+    def __init__(self, session_id: str, system_prompt: str, user_name, window: int, answer_slots: int):
+        self.session_id = session_id
+        self.system_prompt = system_prompt
+        self.user_name = user_name
+        self.answer_slots = answer_slots
+        self.answers = []  # the first `answer_slots` user messages, in the order the questions are asked
+        self.recent = deque(maxlen=window)
+        self.message_count = 0
+        self.user_message_count = 0
+        self.last_used = time.monotonic()
+        self.lock = asyncio.Lock()  # one turn at a time, even from two connections
+
+    def add(self, message: SessionMessage):
+        self.recent.append(message)
+        self.message_count += 1
+        if message.sender == "user":
+            self.user_message_count += 1
+            if len(self.answers) < self.answer_slots:
+                self.answers.append(message)
+
+    def to_document(self) -> dict:
+        return {
+            "_id": self.session_id,
+            "system_prompt": self.system_prompt,
+            "user_name": self.user_name,
+            "answers": [message.text for message in self.answers],
+            "recent": [list(message) for message in self.recent],
+            "message_count": self.message_count,
+            "user_message_count": self.user_message_count,
+            "updated_at": datetime.datetime.now(datetime.timezone.utc),
+        }
+
+    @classmethod
+    def from_document(cls, document: dict, window: int, answer_slots: int) -> "ChatSession":
+        session = cls(document["_id"], document["system_prompt"], document.get("user_name"), window, answer_slots)
+        session.answers = [SessionMessage("user", text) for text in document.get("answers", [])]
+        session.recent.extend(SessionMessage(*message) for message in document.get("recent", []))
+        session.message_count = document.get("message_count", len(session.recent))
+        session.user_message_count = document.get("user_message_count", len(session.answers))
+        return session
+
+
+class ChatSessionStore:
+    """Bounded in-memory sessions with idle eviction, optionally backed by a Mongo collection"""
+
+    def __init__(self, max_sessions: int, idle_ttl: float, window: int, answer_slots: int, collection=None):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.window = window
+        self.answer_slots = answer_slots
+        self.collection = collection
+        self.created = 0
+        self.restored = 0
+        self.evicted = 0
+        self.expired = 0
+        self.save_errors = 0
+        self._sessions = OrderedDict()  # least recently used first
+        self._indexed = False
+
+    def _prune(self):
+        cutoff = time.monotonic() - self.idle_ttl
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if session.last_used > cutoff:
+                break
+            self._sessions.popitem(last=False)
+            self.expired += 1
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evicted += 1
+
+    def _touch(self, session: ChatSession):
+        session.last_used = time.monotonic()
+        self._sessions[session.session_id] = session
+        self._sessions.move_to_end(session.session_id)
+        self._prune()
+
+    def create(self, system_prompt: str, user_name=None, history=()) -> ChatSession:
+        """New session, optionally seeded with the messages of a chat started over HTTP"""
+        session = ChatSession(secrets.token_urlsafe(16), system_prompt, user_name, self.window, self.answer_slots)
+        for message in history:
+            session.add(SessionMessage(message.sender, message.text))
+        self.created += 1
+        self._touch(session)
+        return session
+
+    async def get(self, session_id: str):
+        """The live session, or None if it is unknown or has been idle too long"""
+        self._prune()
+        session = self._sessions.get(session_id)
+        if session is not None:
+            self._touch(session)
+            return session
+        if self.collection is None:
+            return None
+        cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=self.idle_ttl)
+        try:
+            # The TTL monitor only runs once a minute, so check updated_at as well
+            document = await self.collection.find_one({"_id": session_id, "updated_at": {"$gt": cutoff}})
+        except Exception as e:
+            print(f"Chat session lookup failed: {e}")
+            return None
+        if document is None:
+            return None
+        session = ChatSession.from_document(document, self.window, self.answer_slots)
+        self.restored += 1
+        self._touch(session)
+        return session
+
+    async def save(self, session: ChatSession):
+        """Record a finished turn: keeps the session alive and persists it if there is a collection"""
+        self._touch(session)
+        if self.collection is None:
+            return
+        try:
+            if not self._indexed:
+                await self.collection.create_index("updated_at", expireAfterSeconds=int(self.idle_ttl))
+                self._indexed = True
+            await self.collection.replace_one({"_id": session.session_id}, session.to_document(), upsert=True)
+        except Exception as e:
+            # The in-memory copy still works; only resuming elsewhere is affected
+            self.save_errors += 1
+            print(f"Chat session save failed: {e}")
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "created": self.created,
+            "restored": self.restored,
+            "evicted": self.evicted,
+            "expired": self.expired,
+            "save_errors": self.save_errors,
+            "persistent": self.collection is not None,
+        }
@@ -0,0 +1,41 @@
+"""
+Export waitlist or survey data as NDJSON or CSV straight from MongoDB
+Uses the same streaming cursor as /api/admin/export/{dataset}, so memory
+stays constant regardless of collection size.
+
+Usage:
+    python export_data.py waitlist --format csv --output waitlist.csv
+    python export_data.py survey --since 2025-10-01T00:00:00+00:00 > survey.ndjson
+
+The exclusive upper watermark is printed to stderr; pass it as --since on
+the next run for an incremental export.
+"""
+
+import argparse
+import asyncio
+import datetime
+import sys
+
+import app
+
+
+async def main(args):
+    until = datetime.datetime.now(datetime.timezone.utc)
+    since = app.parse_watermark(args.since)
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        async for chunk in app.export_chunks(args.dataset, args.format, since, until):
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+    print(f"Exported {args.dataset} up to {until.isoformat()}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream waitlist or survey data out of MongoDB")
+    parser.add_argument("dataset", choices=sorted(app.EXPORT_DATASETS))
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    parser.add_argument("--since", help="only export documents at or after this ISO 8601 timestamp")
+    parser.add_argument("--output", help="file to write instead of stdout")
+    asyncio.run(main(parser.parse_args()))
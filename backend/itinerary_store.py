@@ -0,0 +1,157 @@
+"""
+Compact storage format for itinerary documents (schema v2)
+
+The API shape stores each preference field twice: once at the top level and
+again inside itinerary_data. LLM output also repeats the same long key names
+for every day. Stored v2 documents look like this:
+
+    _id, user_email, created_at, updated_at   unchanged (queried and indexed)
+    destination, dates, travelers             unchanged (listing fields)
+    title                                     itinerary_data.personalized_title
+    hero                                      itinerary_data.hero_image_url
+    v                                         2
+    n                                         user_name
+    p                                         the other preference fields, short keys
+    b                                         the rest of itinerary_data, short keys
+    z                                         or: b as zstd-compressed JSON
+
+expand_itinerary() returns the API shape the routes have always served. It
+passes documents without "v" (not yet migrated) through unchanged.
+"""
+
+import orjson
+from bson import Binary
+
+try:
+    import zstandard  # optional: pip install zstandard to compress itinerary bodies
+except ImportError:
+    zstandard = None
+
+SCHEMA_VERSION = 2
+
+# Stored at the top level and repeated inside itinerary_data by generate_itinerary
+LISTING_KEYS = ("destination", "dates", "travelers")
+PREFERENCE_KEYS = {"interests": "i", "food_preferences": "f", "budget": "b", "pace": "pc"}
+
+# Keys of the itinerary JSON that simplified_app asks the LLM for
+BODY_KEYS = {
+    "destination_name": "dn",
+    "trip_overview": "to",
+    "destination_insights": "di",
+    "weather_during_visit": "wv",
+    "seasonal_context": "sc",
+    "local_customs_to_know": "lc",
+    "daily_itinerary": "dy",
+    "date": "d",
+    "day_number": "nr",
+    "theme": "th",
+    "breakfast": "bf",
+    "lunch": "lu",
+    "dinner": "dr",
+    "morning_activities": "ma",
+    "afternoon_activities": "aa",
+    "evening_activities": "ea",
+    "restaurant": "r",
+    "dish": "ds",
+    "estimated_cost": "c",
+    "activity": "a",
+    "location": "l",
+    "duration": "du",
+    "practical_tips": "pt",
+}
+BODY_KEYS_REVERSED = {short: key for key, short in BODY_KEYS.items()}
+PREFERENCE_KEYS_REVERSED = {short: key for key, short in PREFERENCE_KEYS.items()}
+
+# Top-level keys written by compact_itinerary() besides the ones kept as-is
+STORED_KEYS = ("v", "title", "hero", "n", "p", "b", "z")
+# itinerary_data fields hoisted to the top level so the listing (and its covering index) can read them
+HOISTED_KEYS = {"personalized_title": "title", "hero_image_url": "hero"}
+
+
+def _rename_keys(value, mapping: dict):
+    if isinstance(value, dict):
+        return {mapping.get(key, key): _rename_keys(item, mapping) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_rename_keys(item, mapping) for item in value]
+    return value
+
+
+def compact_itinerary(document: dict, zstd_min_size=None, zstd_level: int = 3) -> dict:
+    """Convert an API-shaped itinerary document to the v2 storage format.
+
+    The body is zstd-compressed when zstd_min_size is set, zstandard is installed
+    and the encoded body is at least that many bytes. A document that would not
+    survive the round trip unchanged (e.g. unexpected key collisions) is returned
+    as-is, so the result is always safe to store.
+    """
+    if document.get("v") == SCHEMA_VERSION:
+        return document
+    if any(key in document for key in STORED_KEYS):
+        return document
+    stored = {}
+    preferences = {}
+    body = dict(document.get("itinerary_data") or {})
+    for key, value in document.items():
+        if key == "itinerary_data":
+            continue
+        if key == "user_name":
+            stored["n"] = value
+        elif key in PREFERENCE_KEYS:
+            preferences[PREFERENCE_KEYS[key]] = value
+        else:
+            stored[key] = value
+    for key in (*LISTING_KEYS, *PREFERENCE_KEYS):
+        if key in body and key in document and body[key] == document[key]:
+            del body[key]
+    for key, stored_key in HOISTED_KEYS.items():
+        if key in body:
+            stored[stored_key] = body.pop(key)
+    stored["v"] = SCHEMA_VERSION
+    if preferences:
+        stored["p"] = preferences
+    body = _rename_keys(body, BODY_KEYS)
+    encoded = None
+    if zstd_min_size is not None and zstandard is not None and body:
+        try:
+            encoded = orjson.dumps(body)
+        except TypeError:
+            encoded = None  # not plain JSON (e.g. ObjectId values); store it uncompressed
+    if encoded is not None and len(encoded) >= zstd_min_size:
+        stored["z"] = Binary(zstandard.ZstdCompressor(level=zstd_level).compress(encoded))
+    elif body:
+        stored["b"] = body
+    if expand_itinerary(stored) != document:
+        return document
+    return stored
+
+
+def expand_itinerary(stored):
+    """Rebuild the API-shaped document from a v2 one; anything else is returned unchanged"""
+    if not stored or stored.get("v") != SCHEMA_VERSION:
+        return stored
+    if "z" in stored:
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read compressed itineraries")
+        body = orjson.loads(zstandard.ZstdDecompressor().decompress(stored["z"]))
+    else:
+        body = stored.get("b", {})
+    preferences = {PREFERENCE_KEYS_REVERSED[short]: value for short, value in stored.get("p", {}).items()}
+
+    document = {}
+    itinerary_data = {}
+    for key, value in stored.items():
+        if key in STORED_KEYS:
+            continue
+        document[key] = value
+        if key in LISTING_KEYS:
+            itinerary_data[key] = value
+    if "n" in stored:
+        document["user_name"] = stored["n"]
+    document.update(preferences)
+    itinerary_data.update(preferences)
+    for key, stored_key in HOISTED_KEYS.items():
+        if stored_key in stored:
+            itinerary_data[key] = stored[stored_key]
+    itinerary_data.update(_rename_keys(body, BODY_KEYS_REVERSED))
+    document["itinerary_data"] = itinerary_data
+    return document
@@ -0,0 +1,134 @@
+"""
+Incremental JSON parsing for streamed LLM output
+Reports each top-level field of a JSON object (and each element of chosen
+top-level arrays) as soon as its text has closed, while later parts of the
+document are still being generated.
+"""
+
+import json
+
+SCALAR_START = set("-0123456789tfn")
+
+
+class _Frame:
+    __slots__ = ("kind", "key", "expect_key", "index")
+
+    def __init__(self, kind: str):
+        self.kind = kind  # "{" or "["
+        self.key = None  # last key seen, for objects
+        self.expect_key = kind == "{"
+        self.index = 0  # current element, for arrays
+
+
+class IncrementalJSONParser:
+    """Feed text chunks of one JSON object; get back (path, value) for every finished subtree.
+
+    Paths are ("key",) for top-level fields and ("key", index) for elements of the
+    top-level arrays named in `split_arrays`, which are not reported as a whole.
+    Text before the first "{" (```json fences, prose) is skipped. Subtrees that
+    are not valid JSON are dropped; parse the full text at the end for those.
+    """
+
+    def __init__(self, split_arrays=()):
+        self.split_arrays = set(split_arrays)
+        self.done = False
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._key_chars = None  # raw characters of the key being read
+        self._capture = None  # characters of the value being reported
+        self._capture_depth = 0
+        self._capture_path = None
+        self._in_scalar = False
+
+    def _target_path(self):
+        depth = len(self._stack)
+        frame = self._stack[-1]
+        if depth == 1 and frame.key not in self.split_arrays:
+            return (frame.key,)
+        if depth == 2 and frame.kind == "[" and self._stack[0].key in self.split_arrays:
+            return (self._stack[0].key, frame.index)
+        return None
+
+    def _start_value(self, ch: str) -> bool:
+        """Start capturing the value that begins with `ch` if it is reported; True if so"""
+        if self._capture is not None:
+            return False
+        path = self._target_path()
+        if path is None:
+            return False
+        self._capture = [ch]
+        self._capture_depth = len(self._stack)
+        self._capture_path = path
+        return True
+
+    def _finish(self, out: list):
+        try:
+            out.append((self._capture_path, json.loads("".join(self._capture))))
+        except ValueError:
+            pass
+        self._capture = None
+        self._in_scalar = False
+
+    def feed(self, text: str) -> list:
+        out = []
+        for ch in text:
+            if self.done:
+                break
+            stack = self._stack
+            if not stack:
+                if ch == "{":
+                    stack.append(_Frame("{"))
+                continue
+            if self._capture is not None:
+                if self._in_scalar and (ch in ",}]" or ch.isspace()):
+                    self._finish(out)
+                else:
+                    self._capture.append(ch)
+            frame = stack[-1]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._key_chars is not None:
+                        frame.key = json.loads('"' + "".join(self._key_chars) + '"')
+                        self._key_chars = None
+                        continue
+                    if self._capture is not None and len(stack) == self._capture_depth:
+                        self._finish(out)
+                    continue
+                if self._key_chars is not None:
+                    self._key_chars.append(ch)
+                continue
+            if self._in_scalar:
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                if frame.kind == "{" and frame.expect_key:
+                    self._key_chars = []
+                else:
+                    self._start_value(ch)
+            elif ch == ":":
+                frame.expect_key = False
+            elif ch == ",":
+                if frame.kind == "{":
+                    frame.expect_key = True
+                else:
+                    frame.index += 1
+            elif ch in "{[":
+                self._start_value(ch)
+                stack.append(_Frame(ch))
+            elif ch in "}]":
+                stack.pop()
+                if self._capture is not None and len(stack) == self._capture_depth:
+                    self._finish(out)
+                if not stack:
+                    self.done = True
+            elif ch in SCALAR_START:
+                self._in_scalar = self._start_value(ch)
+        return out
@@ -0,0 +1,395 @@
+"""
+Load test and benchmark suite for app.py and simplified_app.py
+
+Drives every endpoint either in-process (ASGI, no sockets) or over HTTP
+against a running uvicorn, with MongoDB replaced by mongomock-motor or a
+real mongod, and Groq replaced by a local fake server. Reports throughput
+and p50/p95/p99 latency per scenario and saves the run as JSON so later
+runs can be compared for regressions.
+
+Examples:
+    python loadtest.py --target app --concurrency 32 --requests 500
+    python loadtest.py --target simplified --llm-latency 0.2 --output run.json
+    python loadtest.py --target app --mongo uri --compare baseline.json
+    python loadtest.py --target app --mode http --base-url http://localhost:8000 --mongo uri
+
+Dev-only dependencies: mongomock-motor (for --mongo mock).
+"""
+
+import argparse
+import asyncio
+import datetime
+import importlib
+import itertools
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import uuid
+
+import httpx
+
+APP_SCENARIOS = ["signup", "signin", "check-email", "waitlist", "survey", "itinerary-crud"]
+SIMPLIFIED_SCENARIOS = ["chat", "generate-itinerary"]
+
+FAKE_CHAT_REPLY = "Great choice! 🌴 When are you planning to travel?"
+FAKE_ITINERARY = {
+    "destination_name": "Goa",
+    "personalized_title": "Sun, Sand and Susegad",
+    "trip_overview": {
+        "destination_insights": "Portuguese heritage meets Konkan coast.",
+        "weather_during_visit": "Warm, 24-32°C",
+        "seasonal_context": "Peak season",
+        "local_customs_to_know": ["Dress modestly at churches"],
+    },
+    "daily_itinerary": [
+        {
+            "date": f"2025-12-{day:02d}",
+            "day_number": f"Day {day}",
+            "theme": "Beaches",
+            "breakfast": {"restaurant": "Cafe Bodega", "dish": "Poi and bhaji", "estimated_cost": "₹300"},
+            "morning_activities": [{"activity": "Fontainhas walk", "location": "Panaji", "duration": "2 hours"}],
+            "lunch": {"restaurant": "Ritz Classic", "dish": "Fish thali", "estimated_cost": "₹500"},
+            "afternoon_activities": [{"activity": "Aguada Fort", "location": "Candolim", "duration": "2 hours"}],
+            "dinner": {"restaurant": "Gunpowder", "dish": "Kerala prawn curry", "estimated_cost": "₹900"},
+        }
+        for day in range(1, 4)
+    ],
+    "practical_tips": ["Rent a scooter"],
+}
+
+
+# --- Fake Groq server ---
+
+def fake_stream_chunks(content: str, model: str, latency: float):
+    """OpenAI-style SSE chunks spreading `latency` evenly across the reply's pieces"""
+    pieces = [content[i:i + 4] for i in range(0, len(content), 4)] or [""]  # ~one token each
+    chunk_id = f"chatcmpl-{uuid.uuid4().hex}"
+
+    def frame(delta: dict, finish_reason=None, **extra) -> str:
+        chunk = {
+            "id": chunk_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            **extra,
+        }
+        return f"data: {json.dumps(chunk)}\n\n"
+
+    async def chunks():
+        yield frame({"role": "assistant", "content": ""})
+        for piece in pieces:
+            await asyncio.sleep(latency / len(pieces))
+            yield frame({"content": piece})
+        usage = {"prompt_tokens": 400, "completion_tokens": len(content) // 4, "total_tokens": 400 + len(content) // 4}
+        yield frame({}, "stop", x_groq={"id": chunk_id, "usage": usage})
+        yield "data: [DONE]\n\n"
+
+    return chunks()
+
+
+def make_fake_groq_app(latency: float):
+    """Fake Groq chat completions: the whole reply after `latency` seconds, or streamed over it"""
+    from fastapi import FastAPI, Request
+    from fastapi.responses import StreamingResponse
+
+    fake = FastAPI()
+
+    @fake.post("/openai/v1/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        # Streamed itineraries ask for JSON in the prompt only (JSON mode does not stream)
+        prompt = body["messages"][-1]["content"] if body.get("messages") else ""
+        wants_json = (body.get("response_format") or {}).get("type") == "json_object" or "JSON travel itinerary" in prompt
+        content = json.dumps(FAKE_ITINERARY) if wants_json else FAKE_CHAT_REPLY
+        if body.get("stream"):
+            return StreamingResponse(
+                fake_stream_chunks(content, body.get("model", "fake"), latency), media_type="text/event-stream"
+            )
+        await asyncio.sleep(latency)
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 400, "completion_tokens": len(content) // 4, "total_tokens": 400 + len(content) // 4},
+        }
+
+    return fake
+
+
+def serve_in_background(asgi_app) -> str:
+    """Serve an ASGI app with uvicorn from a daemon thread and return its base URL"""
+    import uvicorn
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(asgi_app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}"
+
+
+def start_fake_groq(latency: float) -> str:
+    """Serve the fake Groq API from a background thread and return its base URL"""
+    return serve_in_background(make_fake_groq_app(latency))
+
+
+# --- MongoDB stand-in ---
+
+def use_mongomock(module):
+    """Point every collection of an imported app module at mongomock-motor"""
+    import motor.motor_asyncio
+    from mongomock_motor import AsyncMongoMockClient, AsyncMongoMockCollection
+
+    async def bulk_write(self, requests, ordered=True):
+        # mongomock cannot take pymongo's UpdateOne objects, so apply them one by one
+        for op in requests:
+            await self.update_one(op._filter, op._doc, upsert=op._upsert)
+
+    AsyncMongoMockCollection.bulk_write = bulk_write
+    client = AsyncMongoMockClient()
+    module.client_mongo = client
+    module.db = client[module.db.name]
+    for name, value in list(vars(module).items()):
+        if isinstance(value, motor.motor_asyncio.AsyncIOMotorCollection):
+            setattr(module, name, module.db[value.name])
+    if hasattr(module, "survey_writer"):
+        module.survey_writer.collection = module.survey_collection
+    if hasattr(module, "start_database"):
+        async def start_database():
+            # mongomock has no server to ping, so the real one would retry forever
+            await module.ensure_indexes()
+            await module.backfill_email_registry()
+            return True
+
+        module.start_database = start_database
+
+
+# --- Scenarios: each returns an async fn(client, i) -> response ---
+
+def unique_email(prefix: str) -> str:
+    return f"{prefix}-{uuid.uuid4().hex}@loadtest.example.com"
+
+
+async def setup_user(client, users_collection, premium: bool = False) -> dict:
+    email = unique_email("user")
+    resp = await client.post("/api/signup", json={"email": email, "password": "loadtest-pass", "name": "Load Tester"})
+    resp.raise_for_status()
+    if premium:
+        await users_collection.update_one({"email": email}, {"$set": {"has_premium_subscription": True}})
+    return {"email": email, "headers": {"Authorization": f"Bearer {resp.json()['access_token']}"}}
+
+
+async def build_scenario(name, client, users_collection):
+    if name == "signup":
+        async def run(i):
+            return await client.post("/api/signup", json={"email": unique_email("signup"), "password": "loadtest-pass", "name": "Load Tester"})
+    elif name == "signin":
+        user = await setup_user(client, users_collection)
+
+        async def run(i):
+            return await client.post("/api/signin", data={"username": user["email"], "password": "loadtest-pass"})
+    elif name == "check-email":
+        async def run(i):
+            return await client.post("/api/check-email", json={"email": unique_email("check")})
+    elif name == "waitlist":
+        async def run(i):
+            return await client.post("/api/waitlist", json={"email": unique_email("waitlist")})
+    elif name == "survey":
+        async def run(i):
+            return await client.post("/api/survey", json={
+                "step_1": "Beaches", "step_2": i % 5 + 1, "step_3": "Friends", "step_4": "Mid-range",
+                "email": unique_email("survey"),
+            })
+    elif name == "itinerary-crud":
+        if users_collection is None:
+            raise SystemExit("itinerary-crud needs database access: use --mode inprocess or pass --mongo uri")
+        user = await setup_user(client, users_collection, premium=True)
+        payload = {
+            "destination": "Goa", "dates": "2025-12-01 to 2025-12-04", "travelers": "Friends",
+            "interests": "Beaches", "food_preferences": "Veg", "budget": "Mid-range", "pace": "Relaxed",
+        }
+
+        async def run(i):
+            created = await client.post("/api/generate-itinerary", json=payload, headers=user["headers"])
+            if created.status_code != 200:
+                return created
+            path = f"/api/itinerary/{created.json()['itinerary_id']}"
+            fetched = await client.get(path, headers=user["headers"])
+            if fetched.status_code != 200:
+                return fetched
+            return await client.delete(path, headers=user["headers"])
+    elif name == "chat":
+        history = [
+            {"sender": "system", "text": "Where in India would you like to go?"},
+            {"sender": "user", "text": "Goa"},
+            {"sender": "system", "text": "When are you travelling?"},
+            {"sender": "user", "text": "December, 4 days"},
+        ]
+
+        async def run(i):
+            return await client.post("/api/chat-conversation", json={
+                "system_prompt": "You are The Modern Chanakya.", "conversation_history": history, "user_name": "Load Tester",
+            })
+    elif name == "generate-itinerary":
+        # A different traveler profile per request, so each one misses the itinerary cache and calls the LLM
+        run_id = uuid.uuid4().hex[:8]
+        profiles = itertools.count()
+
+        async def run(i):
+            answers = ("Goa", "December", "Friends", "Veg", f"Beaches, loadtest {run_id} {next(profiles)}", "Mid-range", "Relaxed")
+            messages = [{"sender": "user", "text": text} for text in answers]
+            return await client.post("/api/generate-itinerary", json={"messages": messages})
+    else:
+        raise SystemExit(f"Unknown scenario: {name}")
+    return run
+
+
+def percentile(sorted_samples, fraction):
+    if not sorted_samples:
+        return 0.0
+    return sorted_samples[min(len(sorted_samples) - 1, int(len(sorted_samples) * fraction))]
+
+
+async def run_scenario(run, requests: int, concurrency: int) -> dict:
+    latencies, errors, next_index = [], 0, 0
+
+    async def worker():
+        nonlocal errors, next_index
+        while next_index < requests:
+            i, next_index = next_index, next_index + 1
+            start = time.perf_counter()
+            try:
+                resp = await run(i)
+                failed = resp.status_code >= 400
+            except Exception:
+                failed = True
+            latencies.append((time.perf_counter() - start) * 1000)
+            errors += failed
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(requests / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+    }
+
+
+def compare(results: dict, baseline_path: str, threshold: float) -> list:
+    """Scenarios whose p95 grew or throughput dropped by more than `threshold`"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)["scenarios"]
+    regressions = []
+    for name, current in results["scenarios"].items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        if current["p95_ms"] > before["p95_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p95 {before['p95_ms']} -> {current['p95_ms']} ms")
+        if current["throughput_rps"] < before["throughput_rps"] * (1 - threshold):
+            regressions.append(f"{name}: throughput {before['throughput_rps']} -> {current['throughput_rps']} rps")
+    return regressions
+
+
+async def main(args):
+    scenarios = args.scenarios or (APP_SCENARIOS if args.target == "app" else SIMPLIFIED_SCENARIOS)
+    if args.target == "simplified":
+        os.environ["GROQ_BASE_URL"] = start_fake_groq(args.llm_latency)
+        os.environ.setdefault("GROQ_API_KEY", "loadtest-fake-key")
+        os.environ.setdefault("ITINERARY_CACHE_PATH", "")  # keep the one-off profiles out of the on-disk cache
+
+    module, users_collection = None, None
+    if args.mode == "inprocess":
+        module = importlib.import_module("app" if args.target == "app" else "simplified_app")
+        if args.target == "app":
+            if args.mongo == "mock":
+                use_mongomock(module)
+            # The load generator is a single client, so admission limits would only measure 429s
+            for limiter in (module.auth_ip_limiter, module.auth_email_limiter):
+                limiter.capacity = limiter.rate = 1e9
+            module.password_hasher.max_pending = max(module.password_hasher.max_pending, args.concurrency)
+            users_collection = module.users_collection
+        transport = httpx.ASGITransport(app=module.app)
+        base_url = "http://loadtest"
+    else:
+        transport = None
+        base_url = args.base_url
+        if args.mongo == "uri":
+            import motor.motor_asyncio
+            users_collection = motor.motor_asyncio.AsyncIOMotorClient(args.mongodb_uri)["user_database"]["users"]
+
+    results = {
+        "meta": {
+            "target": args.target,
+            "mode": args.mode,
+            "mongo": args.mongo,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "llm_latency": args.llm_latency,
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        },
+        "scenarios": {},
+    }
+
+    async def run_all():
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(transport=transport, base_url=base_url, limits=limits, timeout=120) as client:
+            for name in scenarios:
+                run = await build_scenario(name, client, users_collection)
+                await run_scenario(run, min(args.warmup, args.requests), args.concurrency)
+                stats = await run_scenario(run, args.requests, args.concurrency)
+                results["scenarios"][name] = stats
+                print(f"{name:<20} {stats['throughput_rps']:>9.1f} rps  p50 {stats['p50_ms']:>8.2f}  "
+                      f"p95 {stats['p95_ms']:>8.2f}  p99 {stats['p99_ms']:>8.2f} ms  errors {stats['errors']}")
+
+    if module is not None and hasattr(module.app.router, "lifespan_context"):
+        async with module.app.router.lifespan_context(module.app):
+            await run_all()
+    else:
+        await run_all()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to {args.output}")
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=["app", "simplified"], default="app")
+    parser.add_argument("--mode", choices=["inprocess", "http"], default="inprocess")
+    parser.add_argument("--base-url", default="http://localhost:8000", help="server to drive in --mode http")
+    parser.add_argument("--mongo", choices=["mock", "uri"], default="mock", help="mongomock-motor or MONGODB_URI")
+    parser.add_argument("--mongodb-uri", default=os.getenv("MONGODB_URI", "mongodb://localhost:27017"))
+    parser.add_argument("--scenarios", nargs="*", help="subset of: " + ", ".join(APP_SCENARIOS + SIMPLIFIED_SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests per scenario")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds the fake Groq server waits")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--compare", help="baseline results JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative regression")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
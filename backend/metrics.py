@@ -0,0 +1,250 @@
+"""
+In-process metrics shared by app.py and simplified_app.py
+Per-route latency histograms, in-flight gauges, MongoDB command/pool
+monitoring and LLM call stats, rendered in Prometheus text format.
+
+Nothing here takes a lock. Request metrics are only touched from the event
+loop; pymongo listeners run on driver threads and just append to a deque
+(atomic in CPython), which is drained into the histograms off the hot path.
+"""
+
+import time
+from bisect import bisect_left
+from collections import deque
+
+from pymongo import monitoring
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Drain driver events once this many are pending even if nobody scrapes
+DRAIN_THRESHOLD = 10_000
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _labels(**labels) -> str:
+    return ",".join(f'{key}="{str(value).replace(chr(34), chr(39))}"' for key, value in labels.items())
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.request_latency = {}  # (method, route) -> Histogram
+        self.requests_total = {}  # (method, route, status) -> count
+        self.in_flight = {}  # method -> requests currently being handled
+        self.mongo_commands = {}  # command name -> Histogram
+        self.mongo_failures = {}  # command name -> count
+        self.mongo_pool = {}  # server address -> {"open": n, "checked_out": n}
+        self.llm_latency = {}  # call name -> Histogram
+        self.llm_tokens = {}  # (call name, kind) -> count
+        self.gauges = {}  # metric name -> (help, callable returning a number)
+        self.events = deque()
+
+    # --- HTTP requests (event loop only) ---
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float):
+        key = (method, route)
+        histogram = self.request_latency.get(key)
+        if histogram is None:
+            histogram = self.request_latency[key] = Histogram()
+        histogram.observe(seconds)
+        counter_key = (method, route, status)
+        self.requests_total[counter_key] = self.requests_total.get(counter_key, 0) + 1
+        if len(self.events) > DRAIN_THRESHOLD:
+            self.drain_events()
+
+    # --- LLM calls ---
+
+    def observe_llm_call(self, call: str, seconds: float, usage=None):
+        histogram = self.llm_latency.get(call)
+        if histogram is None:
+            histogram = self.llm_latency[call] = Histogram()
+        histogram.observe(seconds)
+        if usage is not None:
+            for kind in ("prompt_tokens", "completion_tokens"):
+                key = (call, kind)
+                self.llm_tokens[key] = self.llm_tokens.get(key, 0) + (getattr(usage, kind, 0) or 0)
+
+    # --- Gauges sampled at scrape time ---
+
+    def register_gauge(self, name: str, help_text: str, read):
+        self.gauges[name] = (help_text, read)
+
+    # --- pymongo events ---
+
+    def drain_events(self):
+        events = self.events
+        for _ in range(len(events)):
+            kind, name, value = events.popleft()
+            if kind == "command":
+                histogram = self.mongo_commands.get(name)
+                if histogram is None:
+                    histogram = self.mongo_commands[name] = Histogram()
+                histogram.observe(value)
+            elif kind == "command_failed":
+                self.mongo_failures[name] = self.mongo_failures.get(name, 0) + 1
+            else:
+                pool = self.mongo_pool.setdefault(name, {"open": 0, "checked_out": 0})
+                pool[kind] += value
+
+    def mongo_listeners(self):
+        """Listeners to pass as event_listeners= when creating the Motor client"""
+        return [MongoCommandListener(self.events), MongoPoolListener(self.events)]
+
+    # --- Exposition ---
+
+    def render(self) -> str:
+        self.drain_events()
+        lines = []
+
+        def histogram_lines(name, help_text, histograms):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, histogram in histograms:
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f"{name}_sum{{{labels}}} {histogram.sum}")
+                lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+        def counter_lines(name, help_text, kind, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{{{labels}}} {value}")
+
+        histogram_lines(
+            "http_request_duration_seconds", "Request latency by route",
+            [(_labels(method=m, route=r), h) for (m, r), h in self.request_latency.items()],
+        )
+        counter_lines(
+            "http_requests_total", "Requests by route and status", "counter",
+            [(_labels(method=m, route=r, status=s), v) for (m, r, s), v in self.requests_total.items()],
+        )
+        counter_lines(
+            "http_requests_in_flight", "Requests currently being handled", "gauge",
+            [(_labels(method=m), v) for m, v in self.in_flight.items()],
+        )
+        histogram_lines(
+            "mongodb_command_duration_seconds", "MongoDB command round-trip time",
+            [(_labels(command=c), h) for c, h in self.mongo_commands.items()],
+        )
+        counter_lines(
+            "mongodb_command_failures_total", "Failed MongoDB commands", "counter",
+            [(_labels(command=c), v) for c, v in self.mongo_failures.items()],
+        )
+        counter_lines(
+            "mongodb_pool_connections", "Connections in the driver pool", "gauge",
+            [(_labels(address=a, state=state), v) for a, pool in self.mongo_pool.items() for state, v in pool.items()],
+        )
+        histogram_lines(
+            "llm_call_duration_seconds", "LLM completion latency",
+            [(_labels(call=c), h) for c, h in self.llm_latency.items()],
+        )
+        counter_lines(
+            "llm_tokens_total", "LLM tokens used", "counter",
+            [(_labels(call=c, kind=k), v) for (c, k), v in self.llm_tokens.items()],
+        )
+        for name, (help_text, read) in self.gauges.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {read()}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """Times every HTTP request and labels it with the matched route template"""
+
+    def __init__(self, app, registry: MetricsRegistry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        registry = self.registry
+        method = scope["method"]
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        registry.in_flight[method] = registry.in_flight.get(method, 0) + 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            registry.in_flight[method] -= 1
+            # The router stores the matched route in the scope; unmatched paths share one label
+            route = scope.get("route")
+            registry.observe_request(method, getattr(route, "path", "unmatched"), status_code, time.perf_counter() - start)
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    def __init__(self, events: deque):
+        self.events = events
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self.events.append(("command", event.command_name, event.duration_micros / 1e6))
+
+    def failed(self, event):
+        self.events.append(("command_failed", event.command_name, 1))
+
+
+class MongoPoolListener(monitoring.ConnectionPoolListener):
+    def __init__(self, events: deque):
+        self.events = events
+
+    def _address(self, event):
+        return "%s:%s" % event.address
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self.events.append(("open", self._address(event), 1))
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self.events.append(("open", self._address(event), -1))
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        pass
+
+    def connection_checked_out(self, event):
+        self.events.append(("checked_out", self._address(event), 1))
+
+    def connection_checked_in(self, event):
+        self.events.append(("checked_out", self._address(event), -1))
@@ -0,0 +1,112 @@
+"""
+Convert stored itineraries to the compact v2 format (see itinerary_store.py)
+Streams the collection in _id order and rewrites documents in batches, so it
+can run against a live database and be re-run until nothing is left to
+migrate. Documents that cannot be converted losslessly are left as they are.
+Ends with a report of document, collection and index sizes before and after.
+
+Usage:
+    python migrate_itineraries.py [--dry-run] [--batch-size 500] [--limit N]
+    python migrate_itineraries.py --revert    # back to the API shape
+"""
+
+import argparse
+import asyncio
+import time
+
+import bson
+from pymongo import ASCENDING, ReplaceOne
+
+import app
+from itinerary_store import SCHEMA_VERSION, expand_itinerary
+
+STAT_FIELDS = ("count", "size", "avgObjSize", "storageSize", "totalIndexSize")
+
+
+async def collection_stats():
+    """collStats for itineraries: size is the uncompressed (in-cache) data, storageSize what is on disk"""
+    try:
+        stats = await app.db.command("collStats", app.itineraries_collection.name)
+    except Exception as e:
+        print(f"collStats unavailable: {e}")
+        return None
+    summary = {field: stats.get(field) for field in STAT_FIELDS}
+    summary["summaryIndexSize"] = stats.get("indexSizes", {}).get("user_email_created_at_summary_v3")
+    return summary
+
+
+def megabytes(size) -> str:
+    return "-" if size is None else f"{size / 1_000_000:.2f} MB"
+
+
+async def migrate(args):
+    collection = app.itineraries_collection
+    if args.revert:
+        query, convert = {"v": SCHEMA_VERSION}, expand_itinerary
+    else:
+        query, convert = {"v": {"$exists": False}}, app.compact_itinerary_document
+    cursor = collection.find(query).sort("_id", ASCENDING).batch_size(args.batch_size)
+    if args.limit:
+        cursor = cursor.limit(args.limit)
+
+    converted = unchanged = compressed = 0
+    bytes_before = bytes_after = 0
+    ops = []
+    start = time.perf_counter()
+    async for document in cursor:
+        size = len(bson.encode(document))
+        bytes_before += size
+        new_document = convert(document)
+        if new_document is document:
+            unchanged += 1
+            bytes_after += size
+            continue
+        converted += 1
+        compressed += "z" in new_document
+        bytes_after += len(bson.encode(new_document))
+        # The query in the filter keeps a concurrent run from converting a document twice
+        ops.append(ReplaceOne({"_id": document["_id"], **query}, new_document))
+        if len(ops) >= args.batch_size:
+            if not args.dry_run:
+                await collection.bulk_write(ops, ordered=False)
+            ops = []
+            print(f"  {converted} converted, {unchanged} left as-is ({time.perf_counter() - start:.1f}s)")
+    if ops and not args.dry_run:
+        await collection.bulk_write(ops, ordered=False)
+    return converted, unchanged, compressed, bytes_before, bytes_after
+
+
+async def main(args):
+    stats_before = await collection_stats()
+    converted, unchanged, compressed, bytes_before, bytes_after = await migrate(args)
+    stats_after = None if args.dry_run else await collection_stats()
+
+    action = "Would convert" if args.dry_run else "Converted"
+    direction = "to the API shape" if args.revert else f"to v{SCHEMA_VERSION}"
+    print(f"{action} {converted} itineraries {direction} ({compressed} zstd-compressed), {unchanged} left as-is")
+    documents = converted + unchanged
+    if documents:
+        print(
+            f"Document BSON: {megabytes(bytes_before)} -> {megabytes(bytes_after)} "
+            f"({bytes_after / max(bytes_before, 1):.0%}), "
+            f"avg {bytes_before // documents} -> {bytes_after // documents} bytes"
+        )
+    if stats_before:
+        print(f"{'collStats':<18} {'before':>12} {'after':>12}")
+        for field in (*STAT_FIELDS, "summaryIndexSize"):
+            after = stats_after.get(field) if stats_after else None
+            if field in ("count", "avgObjSize"):
+                print(f"{field:<18} {stats_before[field] or 0:>12} {'-' if after is None else after:>12}")
+            else:
+                print(f"{field:<18} {megabytes(stats_before[field]):>12} {megabytes(after):>12}")
+        # Detail reads pull whole documents into the cache; the listing only reads the summary index
+        print("Working set: size for itinerary reads, summaryIndexSize for the listing")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert stored itineraries to the compact format")
+    parser.add_argument("--dry-run", action="store_true", help="report the savings without writing")
+    parser.add_argument("--revert", action="store_true", help="convert compact documents back to the API shape")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=0, help="stop after this many documents")
+    asyncio.run(main(parser.parse_args()))
@@ -3,19 +3,35 @@ Simplified backend for The Modern Chanakya - Travel Itinerary Generator
 This version focuses on handling API calls correctly with Groq
 """
 
+import asyncio
 import json
 import os
 import datetime
-from fastapi import FastAPI, HTTPException, status, Depends
+import time
+from contextlib import aclosing
+from fastapi import FastAPI, HTTPException, status, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError
 from typing import List, Optional
-from groq import Groq
+from groq import AsyncGroq, Groq
 from dotenv import load_dotenv
+from caching import SQLiteCache, TieredCache, TTLCache
+from chat_prompt import ChatPromptBuilder
+from chat_sessions import ChatSession, ChatSessionStore, SessionMessage
+from fast_responses import SSE_HEADERS, CompressionMiddleware, FastJSONResponse, sse_event
+from json_stream import IncrementalJSONParser
+from metrics import MetricsMiddleware, MetricsRegistry
+from trip_profile import TRIP_FIELDS, answers_by_field, canonical_profile, profile_key
 
 load_dotenv()
 
-app = FastAPI()
+# Responses at least this large are gzip/brotli compressed when the client accepts it
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+
+app = FastAPI(default_response_class=FastJSONResponse)
+
+app.add_middleware(CompressionMiddleware, minimum_size=COMPRESSION_MIN_SIZE)
 
 app.add_middleware(
     CORSMiddleware,
@@ -25,8 +41,185 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize Groq client
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+# Served at /metrics; added last so it is the outermost middleware and times everything
+metrics = MetricsRegistry()
+app.add_middleware(MetricsMiddleware, registry=metrics)
+
+# LLM call configuration
+# Completions take 20-60 s for an itinerary, so they run on the async client and a
+# bounded pool keeps a burst from opening unlimited upstream requests.
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 8))  # Groq calls in flight at once
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", 10))  # seconds to wait for a slot before a 503
+LLM_CHAT_TIMEOUT = float(os.getenv("LLM_CHAT_TIMEOUT", 20))  # seconds per chat completion
+LLM_ITINERARY_TIMEOUT = float(os.getenv("LLM_ITINERARY_TIMEOUT", 90))  # seconds per itinerary completion
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 1))
+
+# Initialize Groq client (GROQ_BASE_URL overrides the endpoint, e.g. for loadtest.py)
+client = AsyncGroq(api_key=os.getenv("GROQ_API_KEY"), max_retries=LLM_MAX_RETRIES)
+
+class LLMCallAborted(HTTPException):
+    """The completion was not delivered: no free slot in time, or the client went away"""
+
+async def wait_for_disconnect(request: Request):
+    # The body has already been read, so the next ASGI message is the disconnect
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+class LLMPool:
+    """Runs Groq completions with at most `max_concurrency` in flight.
+
+    Each call has its own deadline and is cancelled as soon as the HTTP client
+    that asked for it disconnects, so abandoned requests free their slot.
+    """
+
+    def __init__(self, max_concurrency: int, queue_timeout: float):
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.disconnects = 0
+
+    async def _acquire(self):
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise LLMCallAborted(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Our travel planner is busy right now. Please try again in a moment.",
+                headers={"Retry-After": "5"},
+            )
+        finally:
+            self.waiting -= 1
+
+    async def _complete(self, call: str, timeout: float, kwargs: dict):
+        await self._acquire()
+        self.in_flight += 1
+        try:
+            started = time.perf_counter()
+            try:
+                completion = await asyncio.wait_for(client.chat.completions.create(**kwargs), timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise
+            metrics.observe_llm_call(call, time.perf_counter() - started, completion.usage)
+            return completion
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+    async def unless_disconnected(self, request: Request, awaitable):
+        """Await `awaitable`, cancelling it and raising a 499 if the client disconnects first"""
+        task = asyncio.ensure_future(awaitable)
+        disconnected = asyncio.ensure_future(wait_for_disconnect(request))
+        try:
+            await asyncio.wait({task, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            disconnected.cancel()
+            if not task.done():
+                task.cancel()
+                await asyncio.wait({task})  # let it release its slot
+        if task.cancelled():
+            self.disconnects += 1
+            raise LLMCallAborted(status_code=499, detail="Client closed request")
+        return task.result()
+
+    async def complete(self, call: str, request: Optional[Request], timeout: float, **kwargs):
+        """Run one completion; with request=None it is not tied to a client (e.g. shared by several)"""
+        if request is None:
+            return await self._complete(call, timeout, kwargs)
+        return await self.unless_disconnected(request, self._complete(call, timeout, kwargs))
+
+    async def stream(self, call: str, request: Request, timeout: float, **kwargs):
+        """Yield the completion's text deltas as Groq produces them.
+
+        The upstream response is closed as soon as the client disconnects or the
+        deadline passes, so an abandoned stream stops generating right away.
+        With request=None (e.g. a WebSocket) the caller closes the generator instead.
+        """
+        await self._acquire()
+        self.in_flight += 1
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        if request is not None:
+            disconnected = asyncio.ensure_future(wait_for_disconnect(request))
+        else:
+            disconnected = loop.create_future()  # never set
+        upstream = None
+
+        async def race(awaitable):
+            pending = asyncio.ensure_future(awaitable)
+            try:
+                done, _ = await asyncio.wait(
+                    {pending, disconnected}, timeout=max(0.0, deadline - loop.time()), return_when=asyncio.FIRST_COMPLETED
+                )
+            except asyncio.CancelledError:
+                pending.cancel()
+                raise
+            if pending in done:
+                return pending.result()
+            pending.cancel()
+            await asyncio.wait({pending})
+            if disconnected in done:
+                self.disconnects += 1
+                raise LLMCallAborted(status_code=499, detail="Client closed request")
+            self.timeouts += 1
+            raise asyncio.TimeoutError()
+
+        async def next_chunk(chunks):
+            try:
+                return await chunks.__anext__()
+            except StopAsyncIteration:
+                return None
+
+        try:
+            started = time.perf_counter()
+            upstream = await race(client.chat.completions.create(stream=True, **kwargs))
+            chunks = upstream.__aiter__()
+            first_token = True
+            usage = None
+            while (chunk := await race(next_chunk(chunks))) is not None:
+                x_groq = getattr(chunk, "x_groq", None)
+                usage = getattr(x_groq, "usage", None) or usage
+                text = chunk.choices[0].delta.content if chunk.choices else None
+                if text:
+                    if first_token:
+                        metrics.observe_llm_call(f"{call}_first_token", time.perf_counter() - started)
+                        first_token = False
+                    yield text
+            metrics.observe_llm_call(call, time.perf_counter() - started, usage)
+        except asyncio.CancelledError:
+            # StreamingResponse cancels the body iterator when it sees the disconnect first
+            self.disconnects += 1
+            raise
+        finally:
+            disconnected.cancel()
+            if upstream is not None:
+                await upstream.close()
+            self.in_flight -= 1
+            self._slots.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "disconnects": self.disconnects,
+        }
+
+llm_pool = LLMPool(LLM_MAX_CONCURRENCY, LLM_QUEUE_TIMEOUT)
+
+metrics.register_gauge("llm_calls_in_flight", "Groq completions running", lambda: llm_pool.in_flight)
+metrics.register_gauge("llm_calls_waiting", "Requests waiting for a Groq slot", lambda: llm_pool.waiting)
+metrics.register_gauge("llm_calls_rejected", "Requests turned away because no Groq slot freed up", lambda: llm_pool.rejected)
+metrics.register_gauge("llm_call_timeouts", "Groq completions that hit their deadline", lambda: llm_pool.timeouts)
+metrics.register_gauge("llm_client_disconnects", "Groq completions cancelled because the client left", lambda: llm_pool.disconnects)
 
 class Message(BaseModel):
     sender: str
@@ -41,102 +234,108 @@ class ItineraryRequest(BaseModel):
     messages: List[Message]
     current_itinerary: Optional[dict] = None
 
-@app.post("/api/chat-conversation")
-async def chat_conversation(request: ChatConversationRequest):
-    """Handle conversational AI for trip planning"""
-    try:
-        # Add debug logging
-        print("Received chat request")
-        print(f"Conversation history length: {len(request.conversation_history)}")
-        
-        # Convert conversation history to Gemini format
-        conversation_text = ""
-        for msg in request.conversation_history:
-            if msg.sender == "user":
-                conversation_text += f"User: {msg.text}\n"
-            elif msg.sender == "system":
-                conversation_text += f"Assistant: {msg.text}\n"
-        
-        # Create the prompt for conversational response
-        prompt = f"""
-{request.system_prompt}
+# Sent when Groq fails before producing any reply
+CHAT_FALLBACK_RESPONSE = "Hey! 👋 I'd love to help plan your trip to India! Where would you like to visit? From the mountains of Himachal to the beaches of Goa, I can help you discover the perfect destination!"
 
-CONVERSATION SO FAR:
-{conversation_text}
+def trip_fields(messages: List[Message]) -> dict:
+    # Extract answers from the conversation, in the order the chat asks for them
+    return answers_by_field([m.text for m in messages if m.sender == "user"])
 
-USER NAME: {request.user_name or 'User'}
+# Chat prompt configuration
+# The prompt carries the last CHAT_HISTORY_WINDOW messages plus a summary of the
+# earlier answers, so its size stays flat however long the chat gets.
+CHAT_PROMPT_TOKEN_BUDGET = int(os.getenv("CHAT_PROMPT_TOKEN_BUDGET", 2000))
+CHAT_HISTORY_WINDOW = int(os.getenv("CHAT_HISTORY_WINDOW", 8))  # messages sent verbatim
+CHAT_MESSAGE_MAX_TOKENS = int(os.getenv("CHAT_MESSAGE_MAX_TOKENS", 200))
+CHAT_FACT_MAX_TOKENS = int(os.getenv("CHAT_FACT_MAX_TOKENS", 40))
+# Only a guard against abuse: the preferences page's prompt is ~460 tokens and must arrive whole
+CHAT_SYSTEM_PROMPT_MAX_TOKENS = int(os.getenv("CHAT_SYSTEM_PROMPT_MAX_TOKENS", 1000))
 
-Based on the conversation above, respond as "The Modern Chanakya" with the next appropriate message. 
+chat_prompt_builder = ChatPromptBuilder(
+    CHAT_PROMPT_TOKEN_BUDGET, CHAT_HISTORY_WINDOW, CHAT_MESSAGE_MAX_TOKENS,
+    CHAT_FACT_MAX_TOKENS, CHAT_SYSTEM_PROMPT_MAX_TOKENS,
+)
 
-RESPONSE GUIDELINES:
-- Keep responses SHORT and conversational (max 2-3 sentences)
-- Ask ONE clear, simple follow-up question
-- Use casual, friendly tone with emojis naturally
-- Be quick and to the point - like WhatsApp chatting
-- Reference their previous answers briefly to show you're listening
-- After 5-6 exchanges, if you have destination + dates + basic preferences, indicate readiness to generate itinerary
+metrics.register_gauge("chat_prompt_tokens_max", "Largest chat prompt built, in estimated tokens", lambda: chat_prompt_builder.max_tokens)
+metrics.register_gauge(
+    "chat_prompt_messages_dropped", "Chat messages left out of prompts to stay within the budget",
+    lambda: chat_prompt_builder.messages_dropped,
+)
 
-CONVERSATION FLOW (6-7 questions max):
-1. Destination in India (where in Bharat?)
-2. Travel dates (when?)  
-3. Who's traveling (solo/family/friends?)
-4. Main interests (what excites you most?)
-5. Food preferences (vegetarian/non-vegetarian/vegan/jain/any specific dietary needs?)
-6. Budget range (budget/mid-range/luxury?)
-7. Ready to generate if enough info, otherwise ask about pace/special requirements
+def build_chat_prompt(request: ChatConversationRequest) -> str:
+    facts = {field: value for field, value in trip_fields(request.conversation_history).items() if value != "Not specified"}
+    return chat_prompt_builder.build(
+        request.system_prompt, request.conversation_history, request.user_name or "User", facts
+    )
 
-Keep it snappy and WhatsApp-friendly! No long paragraphs.
+def is_ready_for_itinerary(conversation_history: List[Message], ai_response: str) -> bool:
+    """Check if we have enough information to suggest itinerary generation"""
+    user_message_count = sum(1 for msg in conversation_history if msg.sender == "user")
+    return is_ready_after(len(conversation_history), user_message_count, ai_response)
 
-IMPORTANT: Keep responses under 100 words. Be conversational, not formal.
-"""
+def is_ready_after(conversation_length: int, user_message_count: int, ai_response: str) -> bool:
+    """is_ready_for_itinerary() from message counts (up to the latest user message)"""
+    # More intelligent detection of readiness - look for key info
+    return (
+        conversation_length >= 12 or  # After 6 back-and-forth exchanges (12 messages total)
+        "ready to generate" in ai_response.lower() or 
+        "work my magic" in ai_response.lower() or
+        "create your itinerary" in ai_response.lower() or
+        user_message_count >= 6  # User has answered 6 questions
+    )
+
+CHAT_COMPLETION_ARGS = dict(
+    model="openai/gpt-oss-20b",  # Using openai/gpt-oss-20b model
+    temperature=0.8,
+    max_completion_tokens=150,  # Reduced for shorter responses
+    top_p=1,
+    reasoning_effort="medium",
+    stop=None,
+)
+
+@app.post("/api/chat-conversation")
+async def chat_conversation(request: ChatConversationRequest, http_request: Request):
+    """Handle conversational AI for trip planning"""
+    try:
+        # Add debug logging
+        print("Received chat request")
+        print(f"Conversation history length: {len(request.conversation_history)}")
+        
+        prompt = build_chat_prompt(request)
 
         # Generate response using Groq
         print("Calling Groq API for chat response...")
         
         try:
-            completion = client.chat.completions.create(
-                model="openai/gpt-oss-20b",  # Using openai/gpt-oss-20b model
+            completion = await llm_pool.complete(
+                "chat", http_request, LLM_CHAT_TIMEOUT,
                 messages=[
                     {
                         "role": "user",
                         "content": prompt
                     }
                 ],
-                temperature=0.8,
-                max_completion_tokens=150,  # Reduced for shorter responses
-                top_p=1,
-                reasoning_effort="medium",
                 stream=False,
-                stop=None
+                **CHAT_COMPLETION_ARGS,
             )
             
             print("Groq API call successful")
             ai_response = completion.choices[0].message.content.strip()
             print(f"Response length: {len(ai_response)} characters")
+        except LLMCallAborted:
+            raise
         except Exception as api_error:
             print(f"Groq API error: {api_error}")
             # Fall back to a default response if API call fails
-            ai_response = "Hey! 👋 I'd love to help plan your trip to India! Where would you like to visit? From the mountains of Himachal to the beaches of Goa, I can help you discover the perfect destination!"
-        
-        # Check if we have enough information to suggest itinerary generation
-        conversation_length = len(request.conversation_history)
-        user_messages = [msg.text for msg in request.conversation_history if msg.sender == "user"]
-        
-        # More intelligent detection of readiness - look for key info
-        has_destination = any(msg.sender == "user" and len(msg.text) > 2 for msg in request.conversation_history)
-        has_enough_info = (
-            conversation_length >= 12 or  # After 6 back-and-forth exchanges (12 messages total)
-            "ready to generate" in ai_response.lower() or 
-            "work my magic" in ai_response.lower() or
-            "create your itinerary" in ai_response.lower() or
-            len(user_messages) >= 6  # User has answered 6 questions
-        )
+            ai_response = CHAT_FALLBACK_RESPONSE
         
         return {
             "response": ai_response,
-            "ready_for_itinerary": has_enough_info,
+            "ready_for_itinerary": is_ready_for_itinerary(request.conversation_history, ai_response),
         }
         
+    except LLMCallAborted:
+        raise
     except Exception as e:
         print(f"Error in chat conversation: {e}")
         # Return a more helpful error message
@@ -145,21 +344,192 @@ IMPORTANT: Keep responses under 100 words. Be conversational, not formal.
             "ready_for_itinerary": False,
         }
 
-@app.post("/api/generate-itinerary")
-async def generate_itinerary(req: ItineraryRequest):
-    """Generate a travel itinerary based on user preferences"""
-    
-    # Extract answers from the conversation
-    user_messages = [m.text for m in req.messages if m.sender == "user"]
-    
-    destination = user_messages[0] if len(user_messages) > 0 else "Not specified"
-    dates = user_messages[1] if len(user_messages) > 1 else "Not specified"
-    travelers = user_messages[2] if len(user_messages) > 2 else "Not specified"
-    interests = user_messages[3] if len(user_messages) > 3 else "Not specified" 
-    food_preferences = user_messages[4] if len(user_messages) > 4 else "Not specified"
-    budget = user_messages[5] if len(user_messages) > 5 else "Not specified"
-    pace = user_messages[6] if len(user_messages) > 6 else "Not specified"
-    
+@app.post("/api/chat-conversation/stream")
+async def chat_conversation_stream(request: ChatConversationRequest, http_request: Request):
+    """Same as /api/chat-conversation, relayed over Server-Sent Events as tokens arrive.
+
+    Emits `token` events ({"text": ...}) and a final `done` event carrying the
+    full response and ready_for_itinerary. A busy server sends an `error` event.
+    """
+    prompt = build_chat_prompt(request)
+
+    async def events():
+        parts = []
+        try:
+            # aclosing: if this generator stops early, the Groq stream and pool slot are freed now, not at GC
+            async with aclosing(llm_pool.stream(
+                "chat", http_request, LLM_CHAT_TIMEOUT,
+                messages=[{"role": "user", "content": prompt}],
+                **CHAT_COMPLETION_ARGS,
+            )) as tokens:
+                async for text in tokens:
+                    parts.append(text)
+                    yield sse_event("token", {"text": text})
+        except LLMCallAborted as aborted:
+            if aborted.status_code != 499:  # nobody is left to tell about a disconnect
+                yield sse_event("error", {"status": aborted.status_code, "detail": aborted.detail})
+            return
+        except Exception as api_error:
+            print(f"Groq API error: {api_error}")
+            if not parts:
+                parts.append(CHAT_FALLBACK_RESPONSE)
+                yield sse_event("token", {"text": CHAT_FALLBACK_RESPONSE})
+        ai_response = "".join(parts).strip()
+        yield sse_event("done", {
+            "response": ai_response,
+            "ready_for_itinerary": is_ready_for_itinerary(request.conversation_history, ai_response),
+        })
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+# Chat session configuration (/ws/chat)
+# Sessions keep what the next prompt needs (chat_sessions.py), so WebSocket clients
+# send their system prompt once and then only each new message.
+CHAT_SESSION_MAX = int(os.getenv("CHAT_SESSION_MAX", 10_000))  # sessions kept in memory
+CHAT_SESSION_IDLE_TTL = float(os.getenv("CHAT_SESSION_IDLE_TTL", 30 * 60))  # seconds without a turn
+CHAT_SESSION_MONGODB_URI = os.getenv("CHAT_SESSION_MONGODB_URI", "")  # empty: memory only
+CHAT_SESSION_DATABASE = os.getenv("CHAT_SESSION_DATABASE", "user_database")
+
+def chat_session_collection():
+    if not CHAT_SESSION_MONGODB_URI:
+        return None
+    import motor.motor_asyncio  # only needed when sessions are persisted
+    return motor.motor_asyncio.AsyncIOMotorClient(CHAT_SESSION_MONGODB_URI)[CHAT_SESSION_DATABASE]["chat_sessions"]
+
+chat_sessions = ChatSessionStore(
+    CHAT_SESSION_MAX, CHAT_SESSION_IDLE_TTL, CHAT_HISTORY_WINDOW, len(TRIP_FIELDS), chat_session_collection()
+)
+
+metrics.register_gauge("chat_sessions", "Chat sessions held in memory", lambda: len(chat_sessions))
+metrics.register_gauge("chat_sessions_evicted", "Chat sessions dropped to stay under CHAT_SESSION_MAX", lambda: chat_sessions.evicted)
+metrics.register_gauge("chat_sessions_expired", "Chat sessions dropped after CHAT_SESSION_IDLE_TTL", lambda: chat_sessions.expired)
+
+class ChatSessionStart(BaseModel):
+    system_prompt: str
+    user_name: Optional[str] = None
+    conversation_history: List[Message] = []  # to carry on a chat started over HTTP
+
+async def chat_session_turn(websocket: WebSocket, session: ChatSession, text: str, stream: bool = True):
+    """Reply to `text` over the socket (token by token if `stream`), then record both messages"""
+    message = SessionMessage("user", text)
+    facts = {field: value for field, value in trip_fields([*session.answers, message]).items() if value != "Not specified"}
+    prompt = chat_prompt_builder.build(
+        session.system_prompt, [*session.recent, message], session.user_name or "User", facts,
+        omitted=session.message_count - len(session.recent),
+    )
+    parts = []
+    try:
+        if stream:
+            async with aclosing(llm_pool.stream(
+                "chat", None, LLM_CHAT_TIMEOUT,
+                messages=[{"role": "user", "content": prompt}],
+                **CHAT_COMPLETION_ARGS,
+            )) as tokens:
+                async for token in tokens:
+                    parts.append(token)
+                    await websocket.send_json({"type": "token", "text": token})
+        else:
+            completion = await llm_pool.complete(
+                "chat", None, LLM_CHAT_TIMEOUT,
+                messages=[{"role": "user", "content": prompt}],
+                stream=False,
+                **CHAT_COMPLETION_ARGS,
+            )
+            parts.append(completion.choices[0].message.content)
+    except LLMCallAborted as aborted:
+        # Nothing is recorded, so the client can send the same message again
+        await websocket.send_json({"type": "error", "status": aborted.status_code, "detail": aborted.detail})
+        return
+    except WebSocketDisconnect:
+        raise
+    except Exception as api_error:
+        print(f"Groq API error: {api_error}")
+        if not parts:
+            parts.append(CHAT_FALLBACK_RESPONSE)
+            await websocket.send_json({"type": "token", "text": CHAT_FALLBACK_RESPONSE})
+    ai_response = "".join(parts).strip()
+    session.add(message)
+    session.add(SessionMessage("system", ai_response))
+    await chat_sessions.save(session)
+    await websocket.send_json({
+        "type": "done",
+        "response": ai_response,
+        "ready_for_itinerary": is_ready_after(session.message_count - 1, session.user_message_count, ai_response),
+    })
+
+@app.websocket("/ws/chat")
+async def chat_websocket(websocket: WebSocket):
+    """/api/chat-conversation with the conversation kept on the server.
+
+    Client messages (JSON):
+      {"type": "start", "system_prompt": ..., "user_name": ..., "conversation_history": [...]}
+      {"type": "resume", "session_id": ...}
+      {"type": "message", "text": ..., "stream": true}
+    Server messages:
+      {"type": "session", "session_id": ..., "message_count": ...} after start/resume
+      {"type": "token", "text": ...} for each token of a reply, unless "stream" is false
+      {"type": "done", "response": ..., "ready_for_itinerary": ...} at the end of a reply
+      {"type": "error", "status": ..., "detail": ...} for a bad, busy or expired request
+    The socket stays open across turns; a dropped client resumes with its session_id.
+    """
+    await websocket.accept()
+    session = None
+
+    async def send_error(status_code: int, detail: str):
+        await websocket.send_json({"type": "error", "status": status_code, "detail": detail})
+
+    try:
+        while True:
+            try:
+                data = json.loads(await websocket.receive_text())
+            except json.JSONDecodeError:
+                await send_error(400, "Messages must be JSON")
+                continue
+            kind = data.get("type") if isinstance(data, dict) else None
+            if kind == "start":
+                try:
+                    start = ChatSessionStart.model_validate(data)
+                except ValidationError:
+                    await send_error(422, "A start message needs a system_prompt")
+                    continue
+                session = chat_sessions.create(start.system_prompt, start.user_name, start.conversation_history)
+            elif kind == "resume":
+                session = await chat_sessions.get(str(data.get("session_id", "")))
+                if session is None:
+                    await send_error(404, "This chat session has expired. Send a start message to begin a new one.")
+                    continue
+            elif kind == "message":
+                text = data.get("text")
+                if session is None:
+                    await send_error(409, "Send a start or resume message first")
+                elif not isinstance(text, str) or not text.strip():
+                    await send_error(422, "A message needs some text")
+                else:
+                    async with session.lock:
+                        await chat_session_turn(websocket, session, text, data.get("stream", True) is not False)
+                continue
+            else:
+                await send_error(400, "Unknown message type")
+                continue
+            await websocket.send_json(
+                {"type": "session", "session_id": session.session_id, "message_count": session.message_count}
+            )
+    except WebSocketDisconnect:
+        pass
+
+# Bump when the itinerary prompt changes so cached itineraries from the old one are not served
+ITINERARY_PROMPT_VERSION = 2
+
+def build_itinerary_prompt(req: ItineraryRequest) -> str:
+    fields = trip_fields(req.messages)
+    destination = fields["destination"]
+    dates = fields["dates"]
+    travelers = fields["travelers"]
+    interests = fields["interests"]
+    food_preferences = fields["food_preferences"]
+    budget = fields["budget"]
+    pace = fields["pace"]
+
     system_prompt_content = f"""
 You are 'The Modern Chanakya', an elite, AI-powered travel strategist based in India. 
 Create a detailed JSON travel itinerary for the following trip:
@@ -227,121 +597,231 @@ Create a detailed JSON travel itinerary for the following trip:
 
 FINAL REMINDER: You MUST respond ONLY with a valid JSON object. Do NOT include any explanatory text, markdown formatting, or content before or after the JSON. Your response should start with {{ and end with }} with no other characters outside of those.
 """
+    return system_prompt_content
 
+ITINERARY_COMPLETION_ARGS = dict(
+    model="openai/gpt-oss-20b",
+    temperature=0.6,
+    max_completion_tokens=26571,
+    top_p=1,
+    reasoning_effort="medium",
+    stop=None,
+)
+
+def parse_itinerary_reply(llm_reply: str) -> dict:
+    """Parse the itinerary JSON out of the LLM reply, tolerating fences and stray text"""
+    # Clean up the response
+    llm_reply = llm_reply.strip()
+    if llm_reply.startswith("```json"):
+        llm_reply = llm_reply[7:]
+    if llm_reply.startswith("```"):
+        llm_reply = llm_reply[3:]
+    if llm_reply.endswith("```"):
+        llm_reply = llm_reply[:-3]
+    llm_reply = llm_reply.strip()
+    
+    # Parse JSON response
     try:
-        # Use Groq to generate the itinerary
-        completion = client.chat.completions.create(
-            model="openai/gpt-oss-20b",
+        itinerary_data = json.loads(llm_reply)
+    except json.JSONDecodeError:
+        # Find JSON between curly braces
+        import re
+        json_match = re.search(r'(\{.*\})', llm_reply, re.DOTALL)
+        if json_match:
+            potential_json = json_match.group(1)
+            itinerary_data = json.loads(potential_json)
+        else:
+            # Try to find first opening brace and last closing brace
+            first_brace = llm_reply.find('{')
+            last_brace = llm_reply.rfind('}')
+            
+            if first_brace != -1 and last_brace != -1 and first_brace < last_brace:
+                potential_json = llm_reply[first_brace:last_brace+1]
+                itinerary_data = json.loads(potential_json)
+            else:
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail="Failed to parse itinerary data"
+                )
+    return itinerary_data
+
+# Returned when the LLM call fails or its reply cannot be parsed
+FALLBACK_ITINERARY = {
+    "destination_name": "Sample Destination",
+    "personalized_title": "Your India Adventure",
+    "trip_overview": {
+        "destination_insights": "This is a sample itinerary. Please try again with more specific preferences.",
+        "weather_during_visit": "Weather information would appear here.",
+        "seasonal_context": "Season information would appear here.",
+        "local_customs_to_know": ["Sample custom 1", "Sample custom 2"]
+    },
+    "daily_itinerary": [
+        {
+            "date": "2025-08-16",
+            "day_number": "Day 1",
+            "theme": "Exploration Day",
+            "breakfast": {
+                "restaurant": "Sample Restaurant",
+                "dish": "Local Breakfast",
+                "estimated_cost": "₹200-300"
+            },
+            "morning_activities": [
+                {
+                    "activity": "Sample Activity",
+                    "location": "Sample Location",
+                    "duration": "2 hours"
+                }
+            ],
+            "lunch": {
+                "restaurant": "Sample Lunch Place",
+                "dish": "Local Cuisine",
+                "estimated_cost": "₹400-500"
+            },
+            "afternoon_activities": [
+                {
+                    "activity": "Sample Afternoon Activity",
+                    "location": "Sample Location",
+                    "duration": "3 hours"
+                }
+            ],
+            "dinner": {
+                "restaurant": "Sample Dinner Place",
+                "dish": "Special Dinner",
+                "estimated_cost": "₹600-800"
+            }
+        }
+    ],
+    "practical_tips": [
+        "Sample tip 1",
+        "Sample tip 2"
+    ]
+}
+FALLBACK_ITINERARY_MESSAGE = "We've prepared a sample itinerary. For a fully personalized plan, please try again."
+
+# Itinerary cache configuration
+# Chats that canonicalize to the same traveler profile (trip_profile.py) share one
+# generated itinerary: an LRU in memory in front of a SQLite file that survives
+# restarts and is shared by the workers. Fallback itineraries are never cached.
+ITINERARY_CACHE_ENABLED = os.getenv("ITINERARY_CACHE_ENABLED", "true").lower() == "true"
+ITINERARY_CACHE_SIZE = int(os.getenv("ITINERARY_CACHE_SIZE", 500))  # itineraries kept in memory
+ITINERARY_CACHE_TTL = float(os.getenv("ITINERARY_CACHE_TTL", 7 * 24 * 60 * 60))  # seconds
+ITINERARY_CACHE_PATH = os.getenv("ITINERARY_CACHE_PATH", "itinerary_cache.sqlite3")  # empty: memory only
+ITINERARY_CACHE_MAX_BYTES = int(os.getenv("ITINERARY_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+itinerary_cache = TieredCache(
+    TTLCache(ITINERARY_CACHE_SIZE, ITINERARY_CACHE_TTL),
+    SQLiteCache(ITINERARY_CACHE_PATH, ITINERARY_CACHE_MAX_BYTES, ITINERARY_CACHE_TTL)
+    if ITINERARY_CACHE_ENABLED and ITINERARY_CACHE_PATH else None,
+    enabled=ITINERARY_CACHE_ENABLED,
+)
+
+metrics.register_gauge("itinerary_cache_memory_hits", "Itineraries served from the in-memory cache", lambda: itinerary_cache.memory.hits)
+metrics.register_gauge(
+    "itinerary_cache_disk_hits", "Itineraries served from the on-disk cache",
+    lambda: itinerary_cache.disk.hits if itinerary_cache.disk is not None else 0,
+)
+metrics.register_gauge("itinerary_cache_generations", "Itineraries generated on a cache miss", lambda: itinerary_cache.loads)
+metrics.register_gauge(
+    "itinerary_cache_shared", "Itinerary requests that waited on an identical one already generating",
+    lambda: itinerary_cache.flights.calls - itinerary_cache.flights.executions,
+)
+
+def itinerary_cache_key(req: ItineraryRequest) -> str:
+    return profile_key(canonical_profile(trip_fields(req.messages)), ITINERARY_COMPLETION_ARGS["model"], ITINERARY_PROMPT_VERSION)
+
+@app.post("/api/generate-itinerary")
+async def generate_itinerary(req: ItineraryRequest, request: Request):
+    """Generate a travel itinerary based on user preferences"""
+    system_prompt_content = build_itinerary_prompt(req)
+
+    async def generate():
+        # Use Groq to generate the itinerary; not tied to this request, since
+        # identical requests arriving meanwhile wait for the same call
+        completion = await llm_pool.complete(
+            "itinerary", None, LLM_ITINERARY_TIMEOUT,
             messages=[
                 {
                     "role": "user",
                     "content": system_prompt_content
                 }
             ],
-            temperature=0.6,
-            max_completion_tokens=26571,
-            top_p=1,
-            reasoning_effort="medium",
             stream=False,
             response_format={"type": "json_object"},
-            stop=None
+            **ITINERARY_COMPLETION_ARGS,
+        )
+        return parse_itinerary_reply(completion.choices[0].message.content)
+
+    try:
+        itinerary_data = await llm_pool.unless_disconnected(
+            request, itinerary_cache.get_or_load(itinerary_cache_key(req), generate)
         )
-        
-        llm_reply = completion.choices[0].message.content
-        
-        # Clean up the response
-        llm_reply = llm_reply.strip()
-        if llm_reply.startswith("```json"):
-            llm_reply = llm_reply[7:]
-        if llm_reply.startswith("```"):
-            llm_reply = llm_reply[3:]
-        if llm_reply.endswith("```"):
-            llm_reply = llm_reply[:-3]
-        llm_reply = llm_reply.strip()
-        
-        # Parse JSON response
-        try:
-            itinerary_data = json.loads(llm_reply)
-        except json.JSONDecodeError:
-            # Find JSON between curly braces
-            import re
-            json_match = re.search(r'(\{.*\})', llm_reply, re.DOTALL)
-            if json_match:
-                potential_json = json_match.group(1)
-                itinerary_data = json.loads(potential_json)
-            else:
-                # Try to find first opening brace and last closing brace
-                first_brace = llm_reply.find('{')
-                last_brace = llm_reply.rfind('}')
-                
-                if first_brace != -1 and last_brace != -1 and first_brace < last_brace:
-                    potential_json = llm_reply[first_brace:last_brace+1]
-                    itinerary_data = json.loads(potential_json)
-                else:
-                    raise HTTPException(
-                        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                        detail="Failed to parse itinerary data"
-                    )
 
-        return {"itinerary": itinerary_data, "message": "Your itinerary is ready!"}
+        return FastJSONResponse({"itinerary": itinerary_data, "message": "Your itinerary is ready!"})
 
+    except LLMCallAborted:
+        raise
     except Exception as e:
         print(f"Error generating itinerary: {e}")
         # Return a basic sample itinerary as fallback
-        fallback_itinerary = {
-            "destination_name": "Sample Destination",
-            "personalized_title": "Your India Adventure",
-            "trip_overview": {
-                "destination_insights": "This is a sample itinerary. Please try again with more specific preferences.",
-                "weather_during_visit": "Weather information would appear here.",
-                "seasonal_context": "Season information would appear here.",
-                "local_customs_to_know": ["Sample custom 1", "Sample custom 2"]
-            },
-            "daily_itinerary": [
-                {
-                    "date": "2025-08-16",
-                    "day_number": "Day 1",
-                    "theme": "Exploration Day",
-                    "breakfast": {
-                        "restaurant": "Sample Restaurant",
-                        "dish": "Local Breakfast",
-                        "estimated_cost": "₹200-300"
-                    },
-                    "morning_activities": [
-                        {
-                            "activity": "Sample Activity",
-                            "location": "Sample Location",
-                            "duration": "2 hours"
-                        }
-                    ],
-                    "lunch": {
-                        "restaurant": "Sample Lunch Place",
-                        "dish": "Local Cuisine",
-                        "estimated_cost": "₹400-500"
-                    },
-                    "afternoon_activities": [
-                        {
-                            "activity": "Sample Afternoon Activity",
-                            "location": "Sample Location",
-                            "duration": "3 hours"
-                        }
-                    ],
-                    "dinner": {
-                        "restaurant": "Sample Dinner Place",
-                        "dish": "Special Dinner",
-                        "estimated_cost": "₹600-800"
-                    }
-                }
-            ],
-            "practical_tips": [
-                "Sample tip 1",
-                "Sample tip 2"
-            ]
-        }
-        return {
-            "itinerary": fallback_itinerary,
-            "message": "We've prepared a sample itinerary. For a fully personalized plan, please try again."
-        }
+        return FastJSONResponse({"itinerary": FALLBACK_ITINERARY, "message": FALLBACK_ITINERARY_MESSAGE})
+
+@app.post("/api/generate-itinerary/stream")
+async def generate_itinerary_stream(req: ItineraryRequest, request: Request):
+    """Same as /api/generate-itinerary, relayed over Server-Sent Events section by section.
+
+    As soon as a top-level field of the itinerary JSON is complete it is sent as a
+    `field` event ({"key": ..., "value": ...}); each daily_itinerary entry is sent
+    on its own as a `day` event ({"index": ..., "day": ...}), so Day 1 can render
+    while later days are still generating. A final `done` event carries the whole
+    itinerary and message, exactly as the non-streaming endpoint returns them
+    (the sample itinerary if generation failed). A busy server sends an `error` event.
+    A cached itinerary is replayed as the same events at once; concurrent identical
+    streams each generate their own, and the first to finish fills the cache.
+    """
+    system_prompt_content = build_itinerary_prompt(req)
+    cache_key = itinerary_cache_key(req)
+
+    async def events():
+        cached = await itinerary_cache.get(cache_key)
+        if cached is not None:
+            for key, value in cached.items():
+                if key == "daily_itinerary" and isinstance(value, list):
+                    for index, day in enumerate(value):
+                        yield sse_event("day", {"index": index, "day": day})
+                else:
+                    yield sse_event("field", {"key": key, "value": value})
+            yield sse_event("done", {"itinerary": cached, "message": "Your itinerary is ready!"})
+            return
+        parser = IncrementalJSONParser(split_arrays=("daily_itinerary",))
+        parts = []
+        try:
+            # No response_format here: Groq's JSON mode does not support streaming,
+            # the prompt already insists on bare JSON and the parser skips any fence
+            async with aclosing(llm_pool.stream(
+                "itinerary", request, LLM_ITINERARY_TIMEOUT,
+                messages=[{"role": "user", "content": system_prompt_content}],
+                **ITINERARY_COMPLETION_ARGS,
+            )) as tokens:
+                async for text in tokens:
+                    parts.append(text)
+                    for path, value in parser.feed(text):
+                        if len(path) == 2:
+                            yield sse_event("day", {"index": path[1], "day": value})
+                        else:
+                            yield sse_event("field", {"key": path[0], "value": value})
+            itinerary_data = parse_itinerary_reply("".join(parts))
+            message = "Your itinerary is ready!"
+            await itinerary_cache.set(cache_key, itinerary_data)
+        except LLMCallAborted as aborted:
+            if aborted.status_code != 499:  # nobody is left to tell about a disconnect
+                yield sse_event("error", {"status": aborted.status_code, "detail": aborted.detail})
+            return
+        except Exception as e:
+            print(f"Error generating itinerary: {e}")
+            itinerary_data, message = FALLBACK_ITINERARY, FALLBACK_ITINERARY_MESSAGE
+        yield sse_event("done", {"itinerary": itinerary_data, "message": message})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
 
 @app.get("/api/health")
 async def health_check():
@@ -364,6 +844,11 @@ async def health_check():
         "timestamp": datetime.datetime.now().isoformat()
     }
 
+# Prometheus scrape endpoint for this worker
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    return metrics.render()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,93 @@
+"""
+Cold-start profile for app.py
+Reports the slowest imports (python -X importtime) and the wall time from
+process start to the first successful /api/health response under uvicorn.
+
+Usage: python startup_profile.py [top_n] [--module app]
+"""
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+# Nothing listens here; the server must come up without waiting for Mongo
+UNREACHABLE_MONGODB_URI = "mongodb://127.0.0.1:9/?serverSelectionTimeoutMS=2000"
+
+
+def import_profile(module: str = "app"):
+    """[(cumulative_us, self_us, depth, name)] for every module imported by `module`"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+        env={**os.environ, "MONGODB_URI": os.getenv("MONGODB_URI", UNREACHABLE_MONGODB_URI)},
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2  # one space follows the "|"
+        rows.append((int(cumulative_us), int(self_us), depth, name.strip()))
+    return rows
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_first_health(module: str = "app", timeout: float = 30.0) -> float:
+    """Seconds from spawning `uvicorn module:app` until /api/health answers 200"""
+    port = free_port()
+    env = {**os.environ, "MONGODB_URI": os.getenv("MONGODB_URI", UNREACHABLE_MONGODB_URI)}
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", f"{module}:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f"server exited early:\n{server.stderr.read().decode()[-2000:]}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/health", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError(f"/api/health did not answer within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("top_n", nargs="?", type=int, default=25)
+    parser.add_argument("--module", default="app")
+    args = parser.parse_args()
+
+    rows = import_profile(args.module)
+    total = next(row[0] for row in rows if row[3] == args.module)
+    print(f"import {args.module}: {total / 1000:.1f} ms")
+    print(f"{'cumulative':>12} {'self':>10}  direct imports of {args.module}")
+    direct = [row for row in rows if row[2] == 1]
+    for cumulative_us, self_us, _, name in sorted(direct, reverse=True)[:args.top_n]:
+        print(f"{cumulative_us / 1000:10.1f}ms {self_us / 1000:8.1f}ms  {name}")
+    print("\nSlowest modules overall by self time:")
+    for cumulative_us, self_us, _, name in sorted(rows, key=lambda row: row[1], reverse=True)[:args.top_n]:
+        print(f"{cumulative_us / 1000:10.1f}ms {self_us / 1000:8.1f}ms  {name}")
+
+    print(f"\nTime to first /api/health: {time_to_first_health(args.module):.2f} s")
+
+
+if __name__ == "__main__":
+    main()
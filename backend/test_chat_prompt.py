@@ -0,0 +1,71 @@
+# --- Token-budgeted chat prompt: size must not grow with the conversation ---
+import os
+import re
+from types import SimpleNamespace
+
+from backend.chat_prompt import EARLIER_MESSAGES_NOTE, ChatPromptBuilder, count_tokens
+from backend.trip_profile import answers_by_field
+
+BUDGET = 2000
+FACTS = {"destination": "Goa", "dates": "Dec 15-18", "travelers": "4 friends"}
+FRONTEND_PAGE = os.path.join(os.path.dirname(__file__), "..", "frontend", "src", "app", "preferences", "page.tsx")
+
+
+def make_builder(**overrides):
+    config = dict(token_budget=BUDGET, window=8, message_max_tokens=200, fact_max_tokens=40, system_prompt_max_tokens=1000)
+    return ChatPromptBuilder(**{**config, **overrides})
+
+
+def frontend_system_prompt() -> str:
+    with open(FRONTEND_PAGE, encoding="utf-8") as page:
+        return re.search(r"const systemPrompt = `(.*?)`;", page.read(), re.DOTALL).group(1)
+
+
+def conversation(turns: int) -> list:
+    history = []
+    for turn in range(turns):
+        history.append(SimpleNamespace(sender="system", text=f"Question {turn:04d}: what else would you like to do? 🌴"))
+        history.append(SimpleNamespace(sender="user", text=f"Answer {turn:04d}: beaches, forts and a sunset cruise"))
+    return history
+
+
+def test_prompt_size_stays_flat_as_history_grows():
+    builder = make_builder()
+    sizes = [
+        count_tokens(builder.build("You are a travel planner.", conversation(turns), "Asha", FACTS))
+        for turns in (4, 8, 50, 500)
+    ]
+    assert sizes[1] == sizes[2] == sizes[3]
+    assert max(sizes) <= BUDGET
+
+
+def test_recent_messages_and_facts_are_kept():
+    prompt = make_builder().build("You are a travel planner.", conversation(50), "Asha", FACTS)
+    assert "User: Answer 0049:" in prompt and "Question 0046:" in prompt
+    assert "Answer 0010:" not in prompt
+    assert EARLIER_MESSAGES_NOTE in prompt
+    assert "- Destination: Goa" in prompt and "- Travelers: 4 friends" in prompt
+
+
+def test_oversized_inputs_are_clipped_to_the_budget():
+    builder = make_builder(token_budget=800, system_prompt_max_tokens=400)
+    history = conversation(3) + [SimpleNamespace(sender="user", text="Goa " * 5000)]
+    prompt = builder.build("Be helpful. " * 5000, history, "Asha " * 100, {"interests": "forts " * 1000})
+    assert count_tokens(prompt) <= 800
+    assert "User: Goa Goa" in prompt
+
+
+def test_frontend_system_prompt_is_sent_whole():
+    system_prompt = frontend_system_prompt()
+    prompt = make_builder().build(system_prompt, conversation(50), "Asha", FACTS)
+    assert system_prompt in prompt
+    assert count_tokens(prompt) <= BUDGET
+
+
+def test_facts_follow_the_frontend_question_order():
+    flow = frontend_system_prompt().split("QUICK QUESTION FLOW", 1)[1]
+    assert flow.index("food") < flow.index("excited")  # dietary question comes before interests
+    facts = answers_by_field(["Goa", "Dec 15-18", "4 friends", "Non veg", "beaches and forts"])
+    assert facts["food_preferences"] == "Non veg" and facts["interests"] == "beaches and forts"
+    prompt = make_builder().build("You are a travel planner.", conversation(3), "Asha", facts)
+    assert "- Food preferences: Non veg" in prompt and "- Interests: beaches and forts" in prompt
@@ -0,0 +1,32 @@
+# --- Server-side chat sessions behind /ws/chat ---
+import asyncio
+import time
+
+from backend.chat_sessions import ChatSessionStore, SessionMessage
+
+
+def test_session_keeps_answers_and_a_bounded_window():
+    store = ChatSessionStore(max_sessions=10, idle_ttl=60, window=4, answer_slots=7)
+    session = store.create("You are a travel planner.", "Asha")
+    for turn in range(50):
+        session.add(SessionMessage("user", f"answer {turn}"))
+        session.add(SessionMessage("system", f"question {turn}"))
+    assert [message.text for message in session.answers] == [f"answer {turn}" for turn in range(7)]
+    assert [message.text for message in session.recent] == ["answer 48", "question 48", "answer 49", "question 49"]
+    assert (session.message_count, session.user_message_count) == (100, 50)
+
+
+def test_store_is_bounded_and_drops_idle_sessions():
+    async def run():
+        store = ChatSessionStore(max_sessions=2, idle_ttl=60, window=4, answer_slots=7)
+        first, _, third = (store.create("prompt") for _ in range(3))
+        assert await store.get(first.session_id) is None
+        assert await store.get(third.session_id) is third
+
+        store.idle_ttl = 0.01
+        time.sleep(0.02)
+        return store, await store.get(third.session_id)
+
+    store, expired = asyncio.run(run())
+    assert expired is None
+    assert store.stats()["evicted"] == 1 and len(store) == 0
@@ -0,0 +1,115 @@
+# --- Concurrency tests: duplicate waitlist/signup writes and coalesced reads ---
+# The request tests run on mongomock-motor, which enforces the unique indexes the
+# duplicate checks rely on, so they need no MongoDB server.
+import asyncio
+import uuid
+
+import httpx
+import motor.motor_asyncio
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from backend import app as backend_app
+
+PARALLEL_REQUESTS = 20
+
+
+@pytest.fixture
+def mock_mongo(monkeypatch):
+    """Point every collection of the app at a fresh mongomock-motor database for one test"""
+    client = AsyncMongoMockClient()
+    db = client[backend_app.db.name]
+    monkeypatch.setattr(backend_app, "client_mongo", client)
+    monkeypatch.setattr(backend_app, "db", db)
+    for name, value in list(vars(backend_app).items()):
+        if isinstance(value, motor.motor_asyncio.AsyncIOMotorCollection):
+            monkeypatch.setattr(backend_app, name, db[value.name])
+    monkeypatch.setattr(backend_app, "users_email_unique", False)  # set by ensure_indexes()
+    return db
+
+
+async def fire_in_parallel(method, path, **kwargs):
+    await backend_app.ensure_indexes()
+    transport = httpx.ASGITransport(app=backend_app.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await asyncio.gather(*(
+            client.request(method, path, **kwargs) for _ in range(PARALLEL_REQUESTS)
+        ))
+
+
+def test_parallel_duplicate_waitlist_joins(mock_mongo):
+    email = f"waitlist-{uuid.uuid4().hex}@example.com"
+
+    async def run():
+        responses = await fire_in_parallel("POST", "/api/waitlist", json={"email": email})
+        return responses, await backend_app.waitlist_collection.count_documents({"email": email})
+
+    responses, stored = asyncio.run(run())
+    assert all(resp.status_code == 200 for resp in responses)
+    assert [resp.json()["exists"] for resp in responses].count(False) == 1
+    assert stored == 1
+
+
+def test_parallel_duplicate_signups(mock_mongo, monkeypatch):
+    email = f"signup-{uuid.uuid4().hex}@example.com"
+    payload = {"email": email, "password": "testpass", "name": "Race Tester"}
+    monkeypatch.setattr(backend_app.auth_ip_limiter, "capacity", PARALLEL_REQUESTS)
+    monkeypatch.setattr(backend_app.auth_email_limiter, "capacity", PARALLEL_REQUESTS)
+    monkeypatch.setattr(backend_app.password_hasher, "max_pending", PARALLEL_REQUESTS)
+
+    async def run():
+        responses = await fire_in_parallel("POST", "/api/signup", json=payload)
+        return responses, await backend_app.users_collection.count_documents({"email": email})
+
+    responses, stored = asyncio.run(run())
+    codes = [resp.status_code for resp in responses]
+    assert codes.count(200) == 1
+    assert codes.count(400) == PARALLEL_REQUESTS - 1
+    assert stored == 1
+
+
+def test_single_flight_shares_call_and_survives_cancelled_waiter():
+    flights = backend_app.SingleFlight()
+    executions = 0
+
+    async def lookup():
+        nonlocal executions
+        executions += 1
+        await asyncio.sleep(0.05)
+        return {"email": "shared@example.com"}
+
+    async def run():
+        waiters = [asyncio.create_task(flights.do("key", lookup)) for _ in range(PARALLEL_REQUESTS)]
+        await asyncio.sleep(0.01)
+        waiters[0].cancel()  # one client disconnects mid-flight
+        return await asyncio.gather(*waiters, return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert isinstance(results[0], asyncio.CancelledError)
+    assert all(result == {"email": "shared@example.com"} for result in results[1:])
+    assert executions == 1
+    assert flights.stats()["shared"] == PARALLEL_REQUESTS - 1
+
+
+def test_single_flight_abandoning_a_forgotten_call_keeps_the_newer_one():
+    flights = backend_app.SingleFlight()
+    executions = 0
+
+    async def lookup():
+        nonlocal executions
+        executions += 1
+        await asyncio.sleep(0.05)
+        return executions
+
+    async def run():
+        stale = asyncio.create_task(flights.do("key", lookup))
+        await asyncio.sleep(0.01)
+        flights.forget("key")  # e.g. a write made the in-flight read stale
+        fresh = asyncio.create_task(flights.do("key", lookup))
+        await asyncio.sleep(0.01)
+        stale.cancel()  # its only caller leaves, abandoning the stale call
+        await asyncio.sleep(0)
+        return await asyncio.gather(fresh, flights.do("key", lookup))
+
+    assert asyncio.run(run()) == [2, 2]
+    assert executions == 2
@@ -0,0 +1,75 @@
+# --- Itinerary cache: canonical traveler profiles and the memory/disk tiers ---
+import asyncio
+
+from backend.caching import SQLiteCache, TieredCache, TTLCache
+from backend.trip_profile import canonical_profile, profile_key
+
+ITINERARY = {"destination_name": "Goa", "daily_itinerary": [{"day_number": "Day 1"}]}
+
+
+def test_equivalent_answers_share_a_profile():
+    first = canonical_profile({
+        "destination": "Goa!", "dates": "3 days in December", "travelers": "4 friends",
+        "interests": "Beaches and food", "food_preferences": "veg", "budget": "mid-range", "pace": "relaxed",
+    })
+    answers = {
+        "destination": "goa", "dates": "three days in Dec", "travelers": "friends, four of us",
+        "interests": "food, beach", "food_preferences": "Vegetarian", "budget": "medium", "pace": "slow",
+    }
+    second = canonical_profile(answers)
+    assert profile_key(first, "model") == profile_key(second, "model")
+    assert profile_key(first, "model") != profile_key(first, "other-model")
+    longer = canonical_profile({**answers, "dates": "4 days in December"})
+    assert profile_key(longer, "model") != profile_key(first, "model")
+
+
+def test_date_answers_key_on_start_and_length():
+    cases = {
+        "Dec 10 to Dec 14": {"start": "12-10", "days": 5},
+        "December 20 - January 5": {"start": "12-20", "days": 17},
+        "15th to 18th December": {"start": "12-15", "days": 4},
+        "December": {"text": "december"},
+        # The preferences page's "I'm Flexible" reply
+        "2026-10-20 to 2026-10-24": {"start": "2026-10-20", "days": 5},
+    }
+    profiles = {text: canonical_profile({"dates": text})["dates"] for text in cases}
+    assert profiles == cases
+    assert canonical_profile({"dates": "2026-10-27 to 2026-10-31"})["dates"] != profiles["2026-10-20 to 2026-10-24"]
+
+
+def test_negated_food_preferences_stay_distinct():
+    vegetarian = canonical_profile({"food_preferences": "veg"})["food_preferences"]
+    assert vegetarian == ["vegetarian"]
+    for text in ("Non veg", "Non Veg 🍖", "not vegetarian", "🍖 Non-Vegetarian"):
+        assert canonical_profile({"food_preferences": text})["food_preferences"] == ["non-vegetarian"], text
+
+
+def test_concurrent_misses_load_once_and_persist(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    loads = []
+
+    async def load():
+        loads.append(1)
+        await asyncio.sleep(0.05)
+        return ITINERARY
+
+    async def run():
+        cache = TieredCache(TTLCache(10, 60), SQLiteCache(path, 1_000_000, 60))
+        results = await asyncio.gather(*(cache.get_or_load("goa", load) for _ in range(10)))
+        # A new process starts with an empty memory tier and reads the file
+        restarted = TieredCache(TTLCache(10, 60), SQLiteCache(path, 1_000_000, 60))
+        return results, await restarted.get_or_load("goa", load)
+
+    results, after_restart = asyncio.run(run())
+    assert results == [ITINERARY] * 10
+    assert after_restart == ITINERARY
+    assert len(loads) == 1
+
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    disk = SQLiteCache(str(tmp_path / "cache.sqlite3"), max_bytes=250, ttl=60)
+    for key in ("a", "b", "c"):
+        disk.set(key, b"x" * 100)
+    assert disk.get("a") is None
+    assert disk.get("b") is not None and disk.get("c") is not None
+    assert disk.stats()["bytes"] <= 250
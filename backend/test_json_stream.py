@@ -0,0 +1,40 @@
+# --- Incremental JSON parser used by /api/generate-itinerary/stream ---
+import json
+
+from backend.json_stream import IncrementalJSONParser
+
+ITINERARY = {
+    "destination_name": "Goa",
+    "trip_overview": {"destination_insights": "Konkan coast, \"susegad\" pace", "local_customs_to_know": ["{not} [json]"]},
+    "daily_itinerary": [{"day_number": f"Day {day}", "morning_activities": [{"activity": "Walk"}]} for day in (1, 2, 3)],
+    "practical_tips": ["Rent a scooter"],
+    "budget_per_day": 4500,
+    "verified": True,
+}
+
+
+def feed_in_chunks(parser, text, size):
+    events = []
+    for i in range(0, len(text), size):
+        events += [(path, value, i) for path, value in parser.feed(text[i:i + size])]
+    return events
+
+
+def test_subtrees_are_reported_as_soon_as_they_close():
+    text = "```json\n" + json.dumps(ITINERARY, indent=2) + "\n```"
+    for size in (1, 3, 64):
+        parser = IncrementalJSONParser(split_arrays=("daily_itinerary",))
+        events = feed_in_chunks(parser, text, size)
+        assert parser.done
+        assert [path for path, _, _ in events] == [
+            ("destination_name",), ("trip_overview",),
+            ("daily_itinerary", 0), ("daily_itinerary", 1), ("daily_itinerary", 2),
+            ("practical_tips",), ("budget_per_day",), ("verified",),
+        ]
+        assert [value for path, value, _ in events if len(path) == 2] == ITINERARY["daily_itinerary"]
+        assert {path[0]: value for path, value, _ in events if len(path) == 1} == {
+            key: value for key, value in ITINERARY.items() if key != "daily_itinerary"
+        }
+        # Day 1 arrives before the text of Day 2 has been fed
+        day_1_at = next(offset for path, _, offset in events if path == ("daily_itinerary", 0))
+        assert day_1_at < text.index('"Day 2"')
@@ -0,0 +1,35 @@
+# --- Cold-start regression tests for app.py ---
+# Spawns real processes, so no MongoDB is needed: the server must answer
+# /api/health without waiting for the database.
+import os
+import subprocess
+import sys
+
+from backend import startup_profile
+
+# Seconds from process start to the first 200 from /api/health
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", 3.0))
+
+# Imported on first use only; none of them may load while importing app.py
+LAZY_MODULES = ("passlib.context", "jose.jwt", "httpx")
+
+
+def test_heavy_modules_are_not_loaded_at_import():
+    check = (
+        "import sys, app\n"
+        f"for name in {LAZY_MODULES!r}:\n"
+        "    module = sys.modules.get(name)\n"
+        "    if module is not None and type(module).__name__ != '_LazyModule':\n"
+        "        print(name)\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", check], cwd=startup_profile.BACKEND_DIR,
+        capture_output=True, text=True, check=True,
+        env={**os.environ, "MONGODB_URI": startup_profile.UNREACHABLE_MONGODB_URI},
+    )
+    assert result.stdout.split() == []
+
+
+def test_time_to_first_health_within_budget():
+    elapsed = startup_profile.time_to_first_health("app")
+    assert elapsed < STARTUP_BUDGET_SECONDS, f"first /api/health after {elapsed:.2f}s"
@@ -0,0 +1,73 @@
+# --- Survey write-behind buffer: spilled batches and their side effects ---
+import asyncio
+import os
+
+from mongomock_motor import AsyncMongoMockClient
+
+from backend.app import WriteBehindBuffer
+
+
+def make_buffer(tmp_path, after_write):
+    collection = AsyncMongoMockClient()["test"]["survey_responses"]
+    spill_path = str(tmp_path / "survey_spill.ndjson")
+    return WriteBehindBuffer(collection, 10, 0.01, 10, 1, 1, spill_path, after_write=after_write)
+
+
+def test_replay_of_a_batch_that_landed_runs_its_side_effects(tmp_path):
+    seen = []
+
+    async def after_write(docs):
+        seen.extend(doc["email"] for doc in docs)
+
+    buffer = make_buffer(tmp_path, after_write)
+    docs = [{"email": f"guest-{i}@example.com"} for i in range(3)]
+
+    async def run():
+        # insert_many landed but timed out, so the whole batch was spilled
+        await buffer.collection.insert_many(docs)
+        buffer._append_spill(docs)
+        await buffer.replay_spill()
+        return await buffer.collection.count_documents({})
+
+    assert asyncio.run(run()) == 3
+    assert sorted(seen) == [doc["email"] for doc in docs]
+    assert not os.path.exists(buffer.spill_path) and buffer.spilled == 0
+
+
+def test_failed_side_effects_are_retried_without_respilling_the_insert(tmp_path):
+    calls = []
+
+    async def after_write(docs):
+        calls.append(len(docs))
+        if len(calls) == 1:
+            raise RuntimeError("registry unavailable")
+
+    buffer = make_buffer(tmp_path, after_write)
+
+    async def run():
+        assert not await buffer._flush([{"email": "first@example.com"}, {"email": "second@example.com"}])
+        await buffer.replay_spill()
+        return await buffer.collection.count_documents({})
+
+    assert asyncio.run(run()) == 2
+    assert calls == [2, 2]
+    assert buffer.written == 2
+    assert not os.path.exists(buffer.spill_path)
+
+
+def test_replay_recovers_an_interrupted_replay_and_sets_corrupt_lines_aside(tmp_path):
+    seen = []
+
+    async def after_write(docs):
+        seen.extend(doc["email"] for doc in docs)
+
+    buffer = make_buffer(tmp_path, after_write)
+    # A crash mid-replay left .replaying behind, and a torn append left half a line
+    buffer._append_spill([{"email": "interrupted@example.com"}], buffer.spill_path + ".replaying")
+    buffer._append_spill([{"email": "spilled@example.com"}, '{"email": "torn@exa\n'])
+
+    asyncio.run(buffer.replay_spill())
+    assert sorted(seen) == ["interrupted@example.com", "spilled@example.com"]
+    with open(buffer.spill_path + ".corrupt", encoding="utf-8") as f:
+        assert f.read() == '{"email": "torn@exa\n'
+    assert not os.path.exists(buffer.spill_path) and not os.path.exists(buffer.spill_path + ".replaying")
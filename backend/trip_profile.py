@@ -0,0 +1,233 @@
+"""
+Canonical traveler profiles, used as cache keys for generated itineraries
+The answers collected by the chat are free text. Two chats that describe the
+same trip in different words or order ("Goa!" / "goa", "beaches and food" /
+"food, beaches", "veg" / "vegetarian") map to the same profile, so the
+itinerary generated for one can be served to the other.
+"""
+
+import datetime
+import hashlib
+import re
+
+import orjson
+
+# Bump when canonicalization changes so old cache keys stop matching
+PROFILE_VERSION = 2
+
+TRIP_FIELDS = ("destination", "dates", "travelers", "interests", "food_preferences", "budget", "pace")
+# The order the preferences page's system prompt asks for them (frontend/src/app/preferences/page.tsx)
+QUESTION_ORDER = ("destination", "dates", "travelers", "food_preferences", "interests", "budget", "pace")
+
+UNSPECIFIED = "Not specified"
+
+STOPWORDS = {
+    "a", "about", "also", "am", "an", "and", "any", "are", "around", "as", "at", "be", "but", "by", "for",
+    "from", "go", "going", "i", "im", "in", "is", "it", "just", "like", "love", "maybe", "me", "mostly",
+    "my", "of", "on", "or", "our", "please", "plan", "planning", "prefer", "really", "so", "some",
+    "something", "the", "to", "travel", "trip", "us", "very", "visit", "want", "we", "with", "would",
+}
+
+MONTHS = {
+    name: number
+    for number, month in enumerate(
+        ("january", "february", "march", "april", "may", "june",
+         "july", "august", "september", "october", "november", "december"), start=1)
+    for name in (month, month[:3])
+}
+MONTHS["sept"] = 9
+MONTH = r"(" + "|".join(sorted(MONTHS, key=len, reverse=True)) + r")"
+DAY = r"(\d{1,2})"
+RANGE_WORD = r"(?:(?:to|till|until|through) )?"
+# "dec 10 to dec 14", "december 20 january 5", "dec 15 17" (after _normalize)
+MONTH_FIRST_RANGE = re.compile(rf"\b{MONTH} {DAY} {RANGE_WORD}(?:{MONTH} )?{DAY}\b")
+# "15 to 18 december", "28 december to 2 january"
+DAY_FIRST_RANGE = re.compile(rf"\b{DAY} (?:{MONTH} )?{RANGE_WORD}{DAY} {MONTH}\b")
+SINGLE_DATE = re.compile(rf"\b(?:{MONTH} {DAY}|{DAY} {MONTH})\b")
+ISO_DATE = re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b")
+MAX_TRIP_DAYS = 90
+
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "fourteen": 14,
+}
+NUMBER = r"(\d+|" + "|".join(NUMBER_WORDS) + r")"
+DURATION_UNITS = {"day": 1, "night": 1, "week": 7}
+
+TRAVELER_GROUPS = {
+    "solo": "solo", "alone": "solo", "myself": "solo",
+    "couple": "couple", "wife": "couple", "husband": "couple", "partner": "couple", "honeymoon": "couple",
+    "family": "family", "kid": "family", "kids": "family", "children": "family", "child": "family", "parents": "family",
+    "friends": "friends", "friend": "friends", "buddies": "friends", "colleagues": "friends",
+}
+GROUP_SIZES = {"solo": 1, "couple": 2}
+
+# Words that mean the same thing for each field; an answer becomes the set of values it names
+FIELD_SYNONYMS = {
+    "food_preferences": {
+        "veg": "vegetarian", "vegetarian": "vegetarian", "veggie": "vegetarian",
+        "nonveg": "non-vegetarian", "nonvegetarian": "non-vegetarian", "nonveggie": "non-vegetarian", "everything": "anything", "anything": "anything",
+        "vegan": "vegan", "jain": "jain", "eggetarian": "eggetarian",
+    },
+    "budget": {
+        "cheap": "budget", "low": "budget", "affordable": "budget", "backpacker": "budget",
+        "backpacking": "budget", "economical": "budget", "tight": "budget",
+        "mid": "mid-range", "midrange": "mid-range", "moderate": "mid-range", "medium": "mid-range",
+        "luxury": "luxury", "premium": "luxury", "high": "luxury", "lavish": "luxury", "splurge": "luxury",
+    },
+    "pace": {
+        "relaxed": "relaxed", "relaxing": "relaxed", "slow": "relaxed", "leisurely": "relaxed", "chill": "relaxed",
+        "easy": "relaxed", "laid": "relaxed",
+        "moderate": "moderate", "balanced": "moderate", "medium": "moderate", "normal": "moderate",
+        "packed": "packed", "fast": "packed", "busy": "packed", "intense": "packed", "hectic": "packed",
+    },
+}
+# "non veg", "not vegetarian" -> "nonveg", "nonvegetarian", so the negation is not lost with the space
+NEGATION = re.compile(r"\b(?:non|not) (?=veg)")
+
+
+def _normalize(text: str) -> str:
+    text = re.sub(r"(?<=[a-z])-(?=[a-z])", "", text.lower())  # non-veg -> nonveg
+    text = re.sub(r"(?<=\d),(?=\d)", "", text)  # 50,000 -> 50000
+    text = re.sub(r"(?<=\d)(?:st|nd|rd|th)\b", "", text)  # 15th -> 15
+    return re.sub(r"[^a-z0-9]+", " ", text).strip()
+
+
+def _number(word: str) -> int:
+    return int(word) if word.isdigit() else NUMBER_WORDS[word]
+
+
+def _stem(token: str) -> str:
+    # beaches -> beach, forts -> fort; good enough to merge plural and singular answers
+    if len(token) > 4 and token.endswith("es") and token[-3] in "sxh":
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def _tokens(text: str) -> list:
+    return sorted({_stem(token) for token in _normalize(text).split() if token not in STOPWORDS})
+
+
+def _date(year, month: int, day: int):
+    try:
+        return datetime.date(year or 2001, month, day)  # 2001: any non-leap year when none is given
+    except ValueError:
+        return None
+
+
+def _span(start, end):
+    """Days from `start` to `end` inclusive, rolling `end` into the next year if it comes first"""
+    if start is None or end is None:
+        return None
+    if end < start:
+        end = _date(end.year + 1, end.month, end.day)
+        if end is None:
+            return None
+    days = (end - start).days + 1
+    return days if 0 < days <= MAX_TRIP_DAYS else None
+
+
+def _start_key(start, year) -> str:
+    # Without a year the same calendar days recur, so only month and day are kept
+    return start.isoformat() if year else start.strftime("%m-%d")
+
+
+def canonical_dates(text: str) -> dict:
+    """Start date and trip length in days as far as they are stated, e.g. {"start": "12-15", "days": 4}.
+
+    Both are kept exact: the itinerary has one dated entry per day, so it cannot be
+    served for another length or another start. Answers naming only a month (and
+    maybe a length) key on that; anything not understood keys on its normalized
+    text rather than collapsing onto other answers.
+    """
+    normalized = _normalize(text)
+    iso = [_date(int(y), int(m), int(d)) for y, m, d in ISO_DATE.findall(text)]
+    iso = [day for day in iso if day is not None]
+    if iso:
+        days = _span(iso[0], iso[1]) if len(iso) > 1 else None
+        if days:
+            return {"start": iso[0].isoformat(), "days": days}
+    year_match = re.search(r"\b(20\d\d)\b", normalized)
+    year = int(year_match.group(1)) if year_match else None
+    without_years = re.sub(r" ?\b20\d\d\b", "", normalized)
+
+    start = days = None
+    month_first = MONTH_FIRST_RANGE.search(without_years)
+    day_first = DAY_FIRST_RANGE.search(without_years)
+    if month_first:
+        first_month, first_day, last_month, last_day = month_first.groups()
+        start = _date(year, MONTHS[first_month], int(first_day))
+        days = _span(start, _date(year, MONTHS[last_month or first_month], int(last_day)))
+    elif day_first:
+        first_day, first_month, last_day, last_month = day_first.groups()
+        start = _date(year, MONTHS[first_month or last_month], int(first_day))
+        days = _span(start, _date(year, MONTHS[last_month], int(last_day)))
+    if days is None:
+        single = SINGLE_DATE.search(without_years)
+        if single:
+            month_name, day, day_before, month_after = single.groups()
+            start = _date(year, MONTHS[month_name or month_after], int(day or day_before))
+        duration = re.search(NUMBER + r" ?(day|night|week)s?\b", normalized)
+        if duration:
+            days = _number(duration.group(1)) * DURATION_UNITS[duration.group(2)] + (duration.group(2) == "night")
+        elif "weekend" in normalized:
+            days = 2
+    if days is None:
+        return {"text": normalized}
+    if start is not None:
+        return {"start": _start_key(start, year), "days": days}
+    months = [MONTHS[word] for word in normalized.split() if word in MONTHS]
+    return {"month": months[0] if months else None, "days": days}
+
+
+def canonical_travelers(text: str):
+    """Kind of group and number of people, e.g. {"group": ["family"], "people": 4}"""
+    normalized = _normalize(text)
+    groups = sorted({TRAVELER_GROUPS[word] for word in normalized.split() if word in TRAVELER_GROUPS})
+    counts = [_number(match) for match in re.findall(r"\b" + NUMBER + r"\b", normalized)]
+    people = sum(counts) if counts else None
+    if people is None and len(groups) == 1:
+        people = GROUP_SIZES.get(groups[0])
+    if not groups and people is None:
+        return _tokens(text)
+    return {"group": groups, "people": people}
+
+
+def canonical_choice(field: str, text: str):
+    """The synonyms named in the answer for this field, or its tokens if none is"""
+    synonyms = FIELD_SYNONYMS[field]
+    words = NEGATION.sub("non", _normalize(text)).split()
+    chosen = sorted({synonyms[word] for word in words if word in synonyms})
+    return chosen or _tokens(text)
+
+
+def answers_by_field(answers: list) -> dict:
+    """The user's answers to the chat's questions, in the order given, keyed by TRIP_FIELDS"""
+    by_question = dict(zip(QUESTION_ORDER, answers))
+    return {field: by_question.get(field, UNSPECIFIED) for field in TRIP_FIELDS}
+
+
+def canonical_profile(fields: dict) -> dict:
+    """Canonical form of the trip fields extracted from the chat (see TRIP_FIELDS)"""
+    profile = {}
+    for field in TRIP_FIELDS:
+        text = (fields.get(field) or "").strip()
+        if not text or text == UNSPECIFIED:
+            profile[field] = None
+        elif field == "dates":
+            profile[field] = canonical_dates(text)
+        elif field == "travelers":
+            profile[field] = canonical_travelers(text)
+        elif field in FIELD_SYNONYMS:
+            profile[field] = canonical_choice(field, text)
+        else:
+            profile[field] = _tokens(text)
+    return profile
+
+
+def profile_key(profile: dict, *salt) -> str:
+    """Stable cache key for a canonical profile; `salt` separates e.g. models or prompt versions"""
+    encoded = orjson.dumps([PROFILE_VERSION, profile, salt], option=orjson.OPT_SORT_KEYS)
+    return hashlib.sha256(encoded).hexdigest()